@@ -1,16 +1,55 @@
-
 __version__ = '2.1.0'
 
+# public api, imported lazily so 'setup.py' can read version without dependencies
+__all__ = ['Config', 'Finding', 'Scanner']
+
+def __getattr__(name):
+    if name == 'Config':
+        from etherblob.utils.config import Config
+        return Config
+    if name == 'Finding':
+        from etherblob.lib.output import Finding
+        return Finding
+    if name == 'Scanner':
+        from etherblob.lib.scanner import Scanner
+        return Scanner
+
+    raise AttributeError(f"module 'etherblob' has no attribute '{name}'")
+
+
 def main():
+    import json
+    import sys
     from etherblob.lib.explorer import EtherBlobExplorer
+    from etherblob.lib.scanner import Scanner
     from etherblob.utils.args import Args
+    from etherblob.utils.errors import EtherBlobError
+
+    # reanalysis of a recorded corpus
+    if sys.argv[1:2] == ['reanalyze']:
+        from etherblob.lib.reanalyzer import Reanalyzer
+
+        try:
+            Reanalyzer(Args.get_reanalyze_args()).run()
+        except EtherBlobError:
+            exit(127)
+        return
 
     # get args
     args = Args.get_args()
 
-    # instantiate main explorer
-    explorer = EtherBlobExplorer(args)
-    explorer.run_engine()
+    try:
+        # stream findings as json lines
+        if args.jsonl:
+            for finding in Scanner(args):
+                print(json.dumps(finding._asdict()), flush = True)
+
+        # instantiate main explorer
+        else:
+            explorer = EtherBlobExplorer(args)
+            explorer.run_engine()
+    except EtherBlobError:
+        exit(127)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from requests.adapters import HTTPAdapter
+from etherblob.lib.parser import BlockParser
+from etherblob.utils.errors import ApiError
+
+class Api():
+    URLS = {
+        'main': "https://api.etherscan.io/api",
+        'goerli': "https://api-goerli.etherscan.io/api",
+        'kovan': "https://api-kovan.etherscan.io/api",
+        'rinkeby': "https://api-rinkeby.etherscan.io/api",
+        'ropsten': "https://api-ropsten.etherscan.io/api"
+    }
+    CHUNK_SIZE = 2**16          # size of response chunks fed to streaming parsers
+    HEADERS = {'Accept-Encoding': "gzip, deflate", 'Connection': "keep-alive"}
+    EMPTY_MESSAGES = ("No records found", "No transactions found")     # empty lists come as failed queries
+
+    # pooled keep-alive client for the api, with as many connections as concurrent requests, sending
+    # at most N requests per sec (unlimited if 0)
+    def __init__(self, api_key, net, concurrency = 1, timeouts = (5, 30), rate_limit = 0):
+        self.api_key = api_key
+        self.url = self.URLS[net]
+        self.timeouts = tuple(timeouts)
+        self.session = self.create_session(concurrency)
+
+        # min secs between requests and when next one can be sent (shared by every concurrent request)
+        self.interval = 1 / rate_limit if rate_limit else 0
+        self.next_t = 0
+        self.rate_lock = threading.Lock()
+
+        # workers for queries issued concurrently
+        self.pool = ThreadPoolExecutor(concurrency)
+
+
+    # query block by number, returning a parser that streams its transactions (or only their
+    # hashes if full transactions are not needed) decoding only the given transaction fields
+    def stream_proxy_block_by_number(self, blk_id, skip = 0, full_tx = True, fields = None):
+        params = {
+            'module': "proxy",
+            'action': "eth_getBlockByNumber",
+            'tag': hex(blk_id),
+            'boolean': "true" if full_tx else "false",
+            'apikey': self.api_key
+        }
+
+        self.throttle()
+        resp = self.session.get(self.url, params = params, stream = True, timeout = self.timeouts)
+        resp.raise_for_status()
+
+        return BlockParser(self.iter_chunks(resp), skip, fields)
+
+
+    # get number of most recent block
+    def get_proxy_block_number(self):
+        return int(self.query(module = "proxy", action = "eth_blockNumber"), 16)
+
+
+    # get closest block commited before/after timestamp
+    def get_block_number_by_timestamp(self, timestamp, closest):
+        return self.query(module = "block", action = "getblocknobytime",
+                            timestamp = timestamp, closest = closest)
+
+
+    # get code at address ('0x' if it's not a contract)
+    def get_proxy_code_at(self, address):
+        return self.query(module = "proxy", action = "eth_getCode", address = address, tag = "latest")
+
+
+    # get value at storage position of contract
+    def get_proxy_storage_position_at(self, position, address):
+        return self.query(module = "proxy", action = "eth_getStorageAt", address = address,
+                            position = position, tag = "latest")
+
+
+    # get values at first N storage positions of contract (queried concurrently, returned in order)
+    def get_proxy_storage_positions_at(self, positions_c, address):
+        return self.pool.map(lambda pos: self.get_proxy_storage_position_at(hex(pos), address),
+                                range(positions_c))
+
+
+    # get a page of normal transactions sent from/to address on a block range (in chain order)
+    def get_account_txlist(self, address, start_block, end_block, page, offset):
+        return self.query(module = "account", action = "txlist", address = address, startblock = start_block,
+                            endblock = end_block, page = page, offset = offset, sort = "asc")
+
+
+    # get event logs emitted on a block range (a page of them if paging)
+    def get_logs(self, from_block, to_block, page = None, offset = None):
+        params = {'module': "logs", 'action': "getLogs", 'fromBlock': from_block, 'toBlock': to_block}
+        if page:
+            params['page'], params['offset'] = page, offset
+
+        return self.query(**params)
+
+
+    # generic query returning its result, raising error on failed ones
+    def query(self, **params):
+        params['apikey'] = self.api_key
+
+        self.throttle()
+        resp = self.session.get(self.url, params = params, timeout = self.timeouts)
+        resp.raise_for_status()
+        content = resp.json()
+
+        # proxy module errors come as json-rpc errors, the others with status '0'
+        if 'error' in content:
+            raise ApiError(f"Error on '{params['action']}' query: {content['error']}")
+        if content.get('status') == "0":
+            if content.get('message') in self.EMPTY_MESSAGES:
+                return content['result']
+            raise ApiError(f"Error on '{params['action']}' query: {content.get('result')}")
+
+        return content['result']
+
+
+    # wait for request's turn under rate limit
+    def throttle(self):
+        if not self.interval:
+            return
+
+        with self.rate_lock:
+            now = monotonic()
+            wait_t = self.next_t - now
+            self.next_t = max(now, self.next_t) + self.interval
+
+        if wait_t > 0:
+            sleep(wait_t)
+
+        return
+
+
+    # iterate over (decompressed) response chunks, releasing connection back to pool when done
+    def iter_chunks(self, resp):
+        try:
+            yield from resp.iter_content(self.CHUNK_SIZE)
+        finally:
+            resp.close()
+
+
+    # create session reusing up to N keep-alive connections
+    def create_session(self, concurrency):
+        session = requests.Session()
+        session.headers.update(self.HEADERS)
+        session.mount("https://", HTTPAdapter(pool_connections = 1, pool_maxsize = concurrency))
+
+        return session
@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import tarfile
+import threading
+from time import time
+
+class Archive():
+    INDEX_NAME = "archive.sqlite"       # sqlite index of archive members (inside extracted files' dir)
+    ARCHIVE_NAME = "archive_{:05}.tar"  # archive file names (plus '.zst' if compressed)
+    BLOCK_SIZE = tarfile.BLOCKSIZE      # tar records are padded to this size
+    BATCH_SIZE = 256                    # max members waiting to be inserted on the index
+    FLUSH_TIME = 5                      # max secs a member waits to be inserted on the index
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS members (
+            sha256 TEXT PRIMARY KEY,
+            archive TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            size INTEGER NOT NULL
+        );
+    """
+
+    # output sink writing files as members of size-rotated tar archives (optionally compressed with zstd,
+    # one frame per member) instead of one file each, indexing where every member is
+    def __init__(self, logger, ext_dir, max_size, compress = False):
+        self.logger = logger
+        self.ext_dir = ext_dir
+        self.max_size = max_size
+        self.compressor = self.get_compressor() if compress else None
+
+        # current archive and its number, members not yet on index and paths of already stored hashes
+        self.archive_n = 0
+        self.archive = None
+        self.pending = []
+        self.stored = {}
+        self.lock = threading.Lock()
+        self.last_flush = time()
+
+        self.db = sqlite3.connect(os.path.join(ext_dir, self.INDEX_NAME), check_same_thread = False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(self.SCHEMA)
+
+
+    # add file as a member named after its hash (if not already there), returns its path inside archive
+    def add(self, data, digest):
+        with self.lock:
+            if digest not in self.stored:
+                if not self.archive or self.archive.tell() >= self.max_size:
+                    self.rotate()
+
+                # tar header, data and padding up to next record (as one frame if compressing)
+                info = tarfile.TarInfo(digest)
+                info.size = len(data)
+                info.mtime = int(time())
+                member = info.tobuf(tarfile.USTAR_FORMAT) + bytes(data) + bytes(-len(data) % self.BLOCK_SIZE)
+                if self.compressor:
+                    member = self.compressor.compress(member)
+
+                offset = self.archive.tell()
+                self.archive.write(member)
+                self.stored[digest] = os.path.join(self.archive.name, digest)
+                self.pending.append((digest, os.path.basename(self.archive.name), offset, len(member), len(data)))
+
+                if len(self.pending) >= self.BATCH_SIZE or (time() - self.last_flush) >= self.FLUSH_TIME:
+                    self.flush_pending()
+
+            return self.stored[digest]
+
+
+    # end current archive and index every pending member
+    def close(self):
+        with self.lock:
+            self.end_archive()
+            self.flush_pending()
+            self.db.close()
+
+        return
+
+
+    # end current archive and start next one (lock must be held)
+    def rotate(self):
+        self.end_archive()
+        self.archive_n += 1
+        self.archive = open(self.archive_path(self.archive_n), "wb")
+        self.logger.info(f"Writing extracted files into archive '{self.archive.name}'...")
+
+        return
+
+
+    # write tar end-of-archive marker and close current archive (lock must be held)
+    def end_archive(self):
+        if self.archive:
+            end = bytes(2 * self.BLOCK_SIZE)
+            self.archive.write(self.compressor.compress(end) if self.compressor else end)
+            self.archive.close()
+            self.archive = None
+
+            # its members must be on index before anyone reads it
+            self.flush_pending()
+
+        return
+
+
+    # insert pending members in one transaction (lock must be held)
+    def flush_pending(self):
+        if self.pending:
+            # members must be on disk before the index points to them
+            if self.archive:
+                self.archive.flush()
+            with self.db:
+                self.db.executemany("INSERT OR IGNORE INTO members (sha256, archive, offset, length, size) "\
+                                    "VALUES (?, ?, ?, ?, ?)", self.pending)
+            self.pending = []
+
+        self.last_flush = time()
+
+        return
+
+
+    # path of n-th archive
+    def archive_path(self, n):
+        path = os.path.join(self.ext_dir, self.ARCHIVE_NAME.format(n))
+
+        return path + ".zst" if self.compressor else path
+
+
+    # get zstd compressor (optional dependency)
+    def get_compressor(self):
+        try:
+            import zstandard
+        except ImportError:
+            self.logger.error("Compressed archives need the 'zstandard' package!")
+            self.logger.error_exit()
+
+        return zstandard.ZstdCompressor()
+
+
+class ArchiveReader():
+    # read single files from archives written on a scan, via their index
+    def __init__(self, ext_dir):
+        self.ext_dir = ext_dir
+        self.db = sqlite3.connect(os.path.join(ext_dir, Archive.INDEX_NAME), check_same_thread = False)
+
+
+    # get file contents by its hash (None if it's not on any archive)
+    def read(self, digest):
+        row = self.db.execute("SELECT archive, offset, length, size FROM members WHERE sha256 = ?",
+                                (digest,)).fetchone()
+        if not row:
+            return None
+
+        archive, offset, length, size = row
+        with open(os.path.join(self.ext_dir, archive), "rb") as archive_file:
+            archive_file.seek(offset)
+            member = archive_file.read(length)
+
+        # every compressed member is a frame of its own
+        if archive.endswith(".zst"):
+            import zstandard
+            member = zstandard.ZstdDecompressor().decompress(member)
+
+        return member[Archive.BLOCK_SIZE:Archive.BLOCK_SIZE + size]
+
+
+    def close(self):
+        self.db.close()
+
+        return
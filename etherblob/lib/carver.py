@@ -0,0 +1,198 @@
+import re
+import struct
+import zlib
+
+class Carver():
+    CHUNK_SIZE = 2**16      # max bytes inflated at once while measuring gzip streams
+    PNG_CHUNK = re.compile(rb"[A-Za-z]{4}")
+    JPEG_SCAN_END = re.compile(rb"\xff(?!\x00|[\xd0-\xd7])")
+
+    # file formats recognized by their magic bytes, with the description given to carved files
+    SIGNATURES = {
+        'png': (rb"\x89PNG\r\n\x1a\n", "PNG image data"),
+        'jpeg': (rb"\xff\xd8\xff[\xc0-\xfe]", "JPEG image data"),
+        'gif': (rb"GIF8[79]a", "GIF image data"),
+        'pdf': (rb"%PDF-", "PDF document"),
+        'zip': (rb"PK\x03\x04", "Zip archive data"),
+        'gzip': (rb"\x1f\x8b\x08", "gzip compressed data"),
+        'sevenzip': (rb"7z\xbc\xaf\x27\x1c", "7-zip archive data")
+    }
+
+    # in-process carver finding files at any offset of data (in one pass over it), using format
+    # structure, trailers or length fields to know where they end
+    def __init__(self):
+        self.signatures = re.compile(b"|".join(b"(?P<%s>%s)" % (fmt.encode(), sig)
+                                        for fmt, (sig, _) in self.SIGNATURES.items()))
+        self.ends = {
+            'png': self.png_end,
+            'jpeg': self.jpeg_end,
+            'gif': self.gif_end,
+            'pdf': self.pdf_end,
+            'zip': self.zip_end,
+            'gzip': self.gzip_end,
+            'sevenzip': self.sevenzip_end
+        }
+
+
+    # carve every file found on data, returns list of (offset, data view, file format)
+    def carve(self, raw_data):
+        files = []
+        last_end = 0
+
+        # views (e.g. over a mapped corpus) can't be searched for trailers
+        if isinstance(raw_data, memoryview):
+            raw_data = bytes(raw_data)
+
+        with memoryview(raw_data) as view:
+            for m in self.signatures.finditer(raw_data):
+                # skip signatures inside an already carved file
+                if (start := m.start()) < last_end:
+                    continue
+
+                try:
+                    end = self.ends[m.lastgroup](raw_data, start)
+                except (IndexError, struct.error, zlib.error):
+                    end = None
+
+                if end:
+                    files.append((start, view[start:end], self.SIGNATURES[m.lastgroup][1]))
+                    last_end = end
+
+        return files
+
+
+    # walk png chunks until 'IEND' one
+    def png_end(self, data, pos):
+        pos += 8
+        if data[pos + 4:pos + 8] != b"IHDR":
+            return None
+
+        while pos + 12 <= len(data):
+            length, = struct.unpack_from(">I", data, pos)
+            chunk_type = data[pos + 4:pos + 8]
+            if not self.PNG_CHUNK.fullmatch(chunk_type):
+                return None
+
+            pos += 12 + length
+            if chunk_type == b"IEND":
+                return pos if pos <= len(data) else None
+
+        return None
+
+
+    # walk jpeg segments (skipping entropy-coded data after scans) until 'EOI' marker
+    def jpeg_end(self, data, pos):
+        pos += 2
+
+        while pos + 2 <= len(data):
+            if data[pos] != 0xff:
+                return None
+            marker = data[pos + 1]
+
+            # padding, end of image and standalone markers
+            if marker == 0xff:
+                pos += 1
+                continue
+            if marker == 0xd9:
+                return pos + 2
+            if marker == 0x01 or 0xd0 <= marker <= 0xd7:
+                pos += 2
+                continue
+
+            length, = struct.unpack_from(">H", data, pos + 2)
+            pos += 2 + length
+
+            # scan data goes until next marker (not counting stuffed bytes and restarts)
+            if marker == 0xda:
+                if not (m := self.JPEG_SCAN_END.search(data, pos)):
+                    return None
+                pos = m.start()
+
+        return None
+
+
+    # walk gif blocks until trailer
+    def gif_end(self, data, pos):
+        flags = data[pos + 10]
+        pos += 13
+        if flags & 0x80:
+            pos += 3 << ((flags & 0x07) + 1)
+
+        while pos < len(data):
+            block = data[pos]
+            if block == 0x3b:
+                return pos + 1
+
+            # image descriptor (with optional local color table and lzw code size) or extension
+            if block == 0x2c:
+                flags = data[pos + 9]
+                pos += 10
+                if flags & 0x80:
+                    pos += 3 << ((flags & 0x07) + 1)
+                pos += 1
+            elif block == 0x21:
+                pos += 2
+            else:
+                return None
+
+            # data sub-blocks until empty one
+            while (size := data[pos]):
+                pos += 1 + size
+            pos += 1
+
+        return None
+
+
+    # pdf goes until its last '%%EOF' marker (incremental updates append more of them), though not
+    # past the next file found after its first one
+    def pdf_end(self, data, pos):
+        if (eof := data.find(b"%%EOF", pos)) == -1:
+            return None
+
+        limit = m.start() if (m := self.signatures.search(data, eof)) else len(data)
+        eof = data.rfind(b"%%EOF", eof, limit)
+
+        end = eof + 5
+        for eol in (b"\r\n", b"\n", b"\r"):
+            if data[end:end + len(eol)] == eol:
+                return end + len(eol)
+
+        return end
+
+
+    # zip goes until end of its central directory record, which points back to start of archive
+    def zip_end(self, data, pos):
+        eocd = pos
+        while (eocd := data.find(b"PK\x05\x06", eocd)) != -1:
+            cd_size, cd_offset, comment_len = struct.unpack_from("<IIH", data, eocd + 12)
+            if pos + cd_offset + cd_size == eocd:
+                end = eocd + 22 + comment_len
+                return end if end <= len(data) else None
+            eocd += 4
+
+        return None
+
+
+    # gzip goes until end of its deflate stream (and trailer), anything after it is left unused
+    def gzip_end(self, data, pos):
+        inflater = zlib.decompressobj(31)
+        out = inflater.decompress(memoryview(data)[pos:], self.CHUNK_SIZE)
+
+        # keep inflating (and discarding) until stream ends or there's nothing left
+        while not inflater.eof and (out or inflater.unconsumed_tail):
+            out = inflater.decompress(inflater.unconsumed_tail, self.CHUNK_SIZE)
+
+        if not inflater.eof:
+            return None
+
+        return len(data) - len(inflater.unused_data)
+
+
+    # 7z start header gives offset and size of next (and last) header
+    def sevenzip_end(self, data, pos):
+        start_crc, next_offset, next_size = struct.unpack_from("<IQQ", data, pos + 8)
+        if zlib.crc32(data[pos + 12:pos + 32]) != start_crc:
+            return None
+
+        end = pos + 32 + next_offset + next_size
+        return end if end <= len(data) else None
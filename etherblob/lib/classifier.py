@@ -0,0 +1,38 @@
+import threading
+import magic
+
+class Classifier():
+    HEAD_SIZE = 2**16       # leading bytes of data handed to libmagic (file headers are found on them)
+
+    # file format classifier keeping a libmagic handle per thread, reused across calls
+    # (instead of python-magic's shared one, which serializes every caller on its lock)
+    def __init__(self):
+        self.local = threading.local()
+
+
+    # get file format of data
+    def classify(self, data):
+        return self.get_handle().from_buffer(self.head(data))
+
+
+    # get file formats of many buffers at once, in order
+    def classify_batch(self, buffers):
+        handle = self.get_handle()
+
+        return [handle.from_buffer(self.head(data)) for data in buffers]
+
+
+    # get (or open) this thread's libmagic handle
+    def get_handle(self):
+        if (handle := getattr(self.local, 'handle', None)) is None:
+            handle = self.local.handle = magic.Magic()
+
+        return handle
+
+
+    # leading bytes of data inspected by libmagic
+    def head(self, data):
+        if isinstance(data, bytes) and len(data) <= self.HEAD_SIZE:
+            return data
+
+        return bytes(data[:self.HEAD_SIZE])
@@ -0,0 +1,89 @@
+import mmap
+import os
+import struct
+import threading
+from etherblob.utils.config import Config
+
+class Corpus():
+    INDEX_EXT = ".idx"                      # extension of offset index next to packed payloads file
+    ENTRY = struct.Struct("<QIBBq32s")      # index entry: offset, size, source kind, network (255 if none),
+                                            # block (-1 if none), tx hash/address
+    NO_NETWORK = 255
+    KINDS = ["transaction", "block", "contract", "address", "log"]
+    ID_SIZES = {'transaction': 32, 'contract': 32, 'address': 20, 'log': 32}
+    MIN_SIZE = 5                            # min payload size worth recording (more than a bare function selector)
+
+    # append-only packed file of payloads seen on a scan, with a compact offset index
+    def __init__(self, path):
+        self.data_file = open(path, "ab")
+        self.idx_file = open(path + self.INDEX_EXT, "ab")
+        self.lock = threading.Lock()
+
+
+    # record payload coming from a given source (on a given network)
+    def add(self, data, ext_type, id, blk_id = None, network = None):
+        if len(data) < self.MIN_SIZE:
+            return
+
+        # blocks are identified by their number only, the rest by their hash or address
+        if ext_type == "block":
+            blk_id, raw_id = id, b""
+        else:
+            raw_id = bytes.fromhex(id[2:])
+        net_id = self.NO_NETWORK if network is None else Config.NETWORKS.index(network)
+
+        with self.lock:
+            offset = self.data_file.tell()
+            self.data_file.write(data)
+            self.idx_file.write(self.ENTRY.pack(offset, len(data), self.KINDS.index(ext_type), net_id,
+                                                -1 if blk_id is None else blk_id, raw_id))
+
+        return
+
+
+    # flush and close both files
+    def close(self):
+        with self.lock:
+            self.data_file.close()
+            self.idx_file.close()
+
+        return
+
+
+class CorpusReader():
+    # read-only, memory-mapped view of a recorded corpus
+    def __init__(self, path):
+        self.data = self.map_file(path)
+        self.index = self.map_file(path + Corpus.INDEX_EXT)
+        self.entries_c = len(self.index) // Corpus.ENTRY.size
+
+
+    def __len__(self):
+        return self.entries_c
+
+
+    # get (source kind, network, block, tx hash/address/block id, payload view) for a given entry
+    def __getitem__(self, i):
+        if not 0 <= i < self.entries_c:
+            raise IndexError("corpus entry out of range")
+
+        offset, size, kind, net_id, blk_id, raw_id = Corpus.ENTRY.unpack_from(self.index, i * Corpus.ENTRY.size)
+        ext_type = Corpus.KINDS[kind]
+        network = None if net_id == Corpus.NO_NETWORK else Config.NETWORKS[net_id]
+        blk_id = None if blk_id == -1 else blk_id
+
+        if ext_type == "block":
+            id = blk_id
+        else:
+            id = "0x" + raw_id[:Corpus.ID_SIZES[ext_type]].hex()
+
+        return ext_type, network, blk_id, id, memoryview(self.data)[offset:offset + size]
+
+
+    # map whole file read-only (empty files can't be mapped)
+    @staticmethod
+    def map_file(path):
+        with open(path, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
@@ -1,11 +1,14 @@
 import os
 import shutil
+import threading
 from pyfiglet import Figlet
 from termcolor import colored
-from time import sleep
-from etherscan import Etherscan
-from etherblob.lib.extractor import Extractor
+from etherblob.lib.corpus import Corpus
+from etherblob.lib.job import Job
+from etherblob.lib.output import Output
+from etherblob.lib.scheduler import Scheduler
 from etherblob.lib.stats import Stats
+from etherblob.lib.timestamps import TimestampIndex
 from etherblob.utils.log import Logger
 from etherblob.utils.wrappers import ends_gracefully
 
@@ -13,33 +16,42 @@ from etherblob.utils.wrappers import ends_gracefully
 class EtherBlobExplorer():
     EXT_DIR = "ext_{}-{}"                   # extracted files dir
     TRANS_FILE = "transactions_{}-{}.txt"   # saved transactions file name
-    MAX_TIME = 2**8                         # max time to retry querying again (accept 8 errors then stop increasing time)
+    JOIN_TIME = 0.5                         # secs between checks for interrupts while waiting for jobs
 
     # make sanity checks and initialize structures
     def __init__(self, args):
-        # get logger, get api key and etherscan object, create extracted files' dir
+        # get logger, get api key, create extracted files' dir
         self.args = args
-        self.print_banner()
+        if args.banner:
+            self.print_banner()
         self.logger = Logger(args)
         self.ext_dir = self.create_ext_dir(args.start_block, args.end_block, args.output_dir)
         api_key = self.get_apikey(args.api_key, args.api_key_path)
-        self.eth_scan = self.init_etherscan(api_key, args.network)
-
-        # resolve block ids from timestamp if enabled
-        args.start_block, args.end_block = self.resolve_blk_id(args.start_block,
-                                                            args.end_block,
-                                                            args.timestamps
-                                                        )
-        # copy starting block id and last retry's time power base
-        self.block_id = args.start_block
-        self.last_retry_t = 2
 
         # handler to transaction file if enabled
         self.trans_file = None
+        if args.save_transactions:
+            self.trans_file = open(self.TRANS_FILE.format(args.start_block, args.end_block), "+w")
+
+        # set when engine is asked to stop before reaching the ending block, and errors that stopped jobs
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.errors = []
+
+        # payloads corpus for later reanalysis, if enabled
+        self.corpus = Corpus(args.corpus) if args.corpus else None
 
-        # start stat engine and extractor passing reference to this same instance
+        # start stat engine, output layer and analysis scheduler shared by every job
         self.stats = Stats(self)
-        self.extractor = Extractor(self)
+        self.output = Output(self)
+        self.scheduler = Scheduler(self)
+
+        # job for given network and range, plus any other ones (each with its own api client and extractor),
+        # with one timestamp index per network (jobs on same network would overwrite each other's)
+        jobs = [(args.network, args.start_block, args.end_block, args.rate_limit)] + args.jobs
+        self.ts_indexes = {net: TimestampIndex(args.ts_index, net) for net, *_ in jobs}
+        self.jobs = [Job(self, api_key, *job) for job in jobs]
+        self.stats.total_blocks = sum(job.total_blocks for job in self.jobs)
 
 
     # main querying engine
@@ -47,68 +59,102 @@ class EtherBlobExplorer():
     def run_engine(self):
         self.logger.info("Started EtherBlobExplorer engine...")
 
-        # if enabled, get file for saved transactions
-        if self.args.save_transactions:
-            self.trans_file = open(self.TRANS_FILE, "+w")
-
-        while (self.block_id != (self.args.end_block + 1)):
-            # attempt to get this block's information
-            try:
-                block_info = self.get_block_info()
-            except Exception as e:
-                continue
-
-            # run diff extraction modes if enabled
-            if self.args.transactions:
-                self.extractor.extract_from_transactions(block_info)
-            if self.args.blocks:
-                self.extractor.extract_from_block(block_info)
-            if self.args.addresses:
-                self.extractor.search_in_trans_address(block_info)
-            if self.args.contracts:
-                self.extractor.extract_from_contract(block_info)
+        # run only job right here, or every job on its own fetch thread
+        try:
+            if len(self.jobs) == 1:
+                self.jobs[0].run()
+            else:
+                self.run_jobs()
+        except KeyboardInterrupt:
+            self.logger.warning("Interrupted, stopping engine...")
+            self.stop()
 
-            self.block_id += 1
+        # wait for jobs (if any still running) and raise first error that stopped them
+        for thread in self.threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
 
-            # show cycle stats
-            self.stats.show_cycle_metrics()
+        # wait for payloads still being analyzed
+        self.scheduler.join()
+        self.scheduler.close()
 
         # close saved transactions file
         if self.args.save_transactions:
             self.trans_file.close()
 
-        # if enabled, extract files from transactions addresses
-        if self.args.addresses:
-            self.extractor.extract_from_trans_address()
+        # extract files from transactions addresses (if enabled) and persist timestamp indexes,
+        # findings' index and corpus
+        for job in self.jobs:
+            job.finish()
+        self.output.close()
+        if self.corpus:
+            self.corpus.close()
 
-        # show final stats
+        # show final stats (and survey results if sampling) and write every pending log
         self.stats.show_final_metrics()
+        for job in self.jobs:
+            if job.sampler:
+                job.sampler.report()
+        self.logger.close()
 
         return
 
 
-    # initialize etherscan object choosing network from args
-    def init_etherscan(self, apikey, net):
-        return Etherscan(apikey, net)
+    # run every job on its own fetch thread until all of them are done
+    def run_jobs(self):
+        self.logger.info(f"Running {len(self.jobs)} jobs: " +\
+                            ", ".join(f"'{job.network}' ({job.args.start_block}-{job.args.end_block})"
+                                        for job in self.jobs))
+
+        self.threads = [threading.Thread(target = self.run_job, args = (job,), daemon = True,
+                                            name = f"etherblob-{job.network}") for job in self.jobs]
+        for thread in self.threads:
+            thread.start()
 
+        # join with timeout so interrupts still get here
+        for thread in self.threads:
+            while thread.is_alive():
+                thread.join(self.JOIN_TIME)
+
+        return
 
-    # get block information
-    def get_block_info(self):
+
+    # fetch thread of a job, stopping the other ones if it fails
+    def run_job(self, job):
         try:
-            block_info = self.eth_scan.get_proxy_block_by_number(tag = hex(self.block_id))
-        except Exception as e:
-            self.logger.warning(f"Problem found while querying block '{self.block_id}': {e}")
-            self.logger.info(f"Sleeping for {self.last_retry_t} [s] and retrying...")
-            sleep(self.last_retry_t)
+            job.run()
+        except BaseException as e:
+            self.errors.append(e)
+            self.stop()
 
-            # if error happens then retry again increasing the waiting time and raise exception
-            if self.last_retry_t <= self.MAX_TIME:
-                self.last_retry_t = 2 * self.last_retry_t
-            else:
-                self.last_retry_t = self.MAX_TIME
-            raise e
+        return
 
-        return block_info
+
+    # drop payloads not analyzed yet and persist everything found so far (when engine stops on error)
+    def save_progress(self):
+        self.scheduler.close()
+        if self.trans_file:
+            self.trans_file.close()
+        for ts_index in self.ts_indexes.values():
+            ts_index.save()
+        self.output.close()
+        if self.corpus:
+            self.corpus.close()
+
+        return
+
+
+    # ask engine to stop after current block
+    def stop(self):
+        self.stop_event.set()
+
+        return
+
+
+    # count interesting addresses tracked on every job
+    def count_tracked_addr(self):
+        return sum(len(job.extractor.tracked_addr) for job in self.jobs)
 
 
     # create dir for extracted files
@@ -123,34 +169,8 @@ class EtherBlobExplorer():
             self.logger.error(f"Dir '{ext_dir}' already exists...")
             self.logger.error_exit()
 
-        return ext_dir
-
-
-    # check and resolve timestamps if given
-    def resolve_blk_id(self, s_blk, e_blk, parse_as_ts):
-        if parse_as_ts:
-            try:
-                self.logger.info("Parsing blocks as timestamps...")
-                s_blk = self.eth_scan.get_block_number_by_timestamp(
-                                timestamp = s_blk,
-                                closest = 'before'
-                                )
-                self.logger.info(f"Got starting block id '{s_blk}'!")
-
-                e_blk = self.eth_scan.get_block_number_by_timestamp(
-                                timestamp = e_blk,
-                                closest = 'after'
-                                )
-                self.logger.info(f"Got ending block id '{e_blk}'!")
-                s_blk, e_blk = int(s_blk), int(e_blk)
-            except ValueError as e:
-                self.logger.error("Error found while passing block IDs to ints!")
-                self.logger.error_exit()
-            except Exception as e:
-                self.logger.error("Couldn't resolve timestamps to block ids!")
-                self.logger.error_exit()
-
-        return s_blk, e_blk
+        # absolute path, as binwalk changes working dir while other workers write files
+        return os.path.abspath(ext_dir)
 
 
     # get api key from args
@@ -1,20 +1,24 @@
 import os
 import re
-import magic
 import binwalk
 import shutil
+import threading
+from binascii import a2b_hex
 from math import log, ceil
+from etherblob.lib.carver import Carver
+from etherblob.lib.classifier import Classifier
 
 class Extractor():
     IGNORE_DEFAULT_FMTS = ["^Non-ISO", "^ISO-8859 text"]  # default ignored file formats
     IGNORE_ALL_WILDCARD = ["ignore_all"]                  # ignore all file formats wildcard
-    EXT_FILE_NAME = "{}/file_{{}}"                        # generic extracted file name
     STR_MIN_SIZE = 8                                      # min string size for taking into account when 'strings' is enabled
     NL_ENT_MIN = 3.5                                      # min entropy limit for a natural language
     NL_ENT_MAX = 5.0                                      # max entropy limit for a natural language
     ENC_ENT_MIN = 7.0                                     # min entropy limit for encrypted/compressed files
     ENC_ENT_MAX = 8.0                                     # max entropy limit for encrypted/compressed files
     STORAGE_POS = 16                                      # N storage array indexes to search for
+    BINWALK_LOCK = threading.Lock()                       # binwalk changes process' working dir while extracting
+    CARVE_GAP = 64                                        # max bytes left out of carved files to skip binwalk
 
     def __init__(self, blob_exp):
         # get reference to blob explorer and copy frequently used objects
@@ -22,10 +26,13 @@ class Extractor():
         self.stats = blob_exp.stats
         self.trans_file = blob_exp.trans_file
         self.ext_dir = blob_exp.ext_dir
-        self.eth_scan = blob_exp.eth_scan
+        self.api = blob_exp.api
+        self.output = blob_exp.output
+        self.corpus = blob_exp.corpus
+        self.scheduler = blob_exp.scheduler
+        self.network = blob_exp.network
 
-        # parse extracted file name, ignored file formats and contract position
-        self.ext_file_name = self.get_ext_file_path(blob_exp.ext_dir)
+        # parse ignored file formats and contract position
         self.ignored_fmt = self.get_ignored_fmts(blob_exp.args.ignored_fmt)
         self.contract_pos = self.get_contract_position(blob_exp.args.contract_position)
 
@@ -34,23 +41,31 @@ class Extractor():
         self.file_header = self.get_file_header_arg(blob_exp.args)
         self.strings = self.get_strings_arg(blob_exp.args)
         self.ent_limits = self.get_entropy_limits(blob_exp.args)
+        self.ent_window = blob_exp.args.entropy_window
+
+        # in-process carver for files at any offset of data and libmagic classifier
+        self.carver = Carver()
+        self.classifier = Classifier()
 
         # interesting addresses that smuggled data on 'to' field in transaction
         self.tracked_addr = {}
 
+        # 'to' addresses on current block waiting to be classified, as (from address, trans hash, data)
+        self.trans_addr = []
+
         # already searched contracts
         self.tracked_contracts = {}
 
+        # extraction modes to run on every transaction and transaction fields they need
+        self.trans_stubs = self.get_trans_stubs(blob_exp.args)
+        self.trans_fields = self.get_trans_fields(blob_exp.args)
 
-    # attempt to extract files from transactions' input data
-    def extract_from_transactions(self, blk_info):
-        def get_from_transaction_stub(trans, hash_id):
-            # parse input data and search for files
-            data = self.parse_raw_data(trans.get('input'))
-            self.search_and_extract(data, "transaction", hash_id)
 
-        # call generic transaction iter func passing stub
-        self.iterate_over_transactions(get_from_transaction_stub, blk_info)
+    # attempt to extract files from transaction's input data
+    def extract_from_transaction(self, trans, hash_id):
+        # parse input data and search for files
+        data = self.parse_raw_data(trans.get('input'))
+        self.analyze(data, "transaction", hash_id, int(trans.get('blockNumber'), 16))
 
         return
 
@@ -61,11 +76,17 @@ class Extractor():
 
         for addr,data in self.tracked_addr.items():
             try:
+                # record harvested data for later reanalysis (if enabled)
+                if self.corpus:
+                    self.corpus.add(data, "address", addr, network = self.network)
+
                 # check on tracked addresses for embedded files and extract them
                 files = self.get_embedded_files(data, addr)
-                for file_n, file_fmt in files:
+                for file_data, file_fmt in files:
+                    finding = self.output.store(file_data, file_fmt, "embedded", "address", addr,
+                                                network = self.network)
                     self.logger.info_file(f"Found file ({file_fmt}) from address '{addr}', "\
-                                            f"saved to '{file_n}'...")
+                                            f"saved to '{finding.path}'...")
                     self.stats.addr_file_c += 1
             except Exception as e:
                 self.logger.error(f"Unexpected error while extracting files from "\
@@ -83,7 +104,7 @@ class Extractor():
         try:
             # get block input data and search for files
             data = self.parse_raw_data(blk_info.get('extraData'))
-            self.search_and_extract(data, "block", blk_id)
+            self.analyze(data, "block", blk_id)
         except ValueError:
             pass
         except Exception as e:
@@ -93,105 +114,154 @@ class Extractor():
         return
 
 
-    # attempt to extract files from contract's storage
-    def extract_from_contract(self, blk_info):
-        def get_from_contract_stub(trans, hash_id):
-            # get possible contract address
-            contract_addr = trans.get('to', trans.get('creates'))
+    # attempt to extract files from data of event logs
+    def extract_from_logs(self, logs):
+        for evt_log in logs:
+            trans_hash = evt_log.get('transactionHash')
+            try:
+                data = self.parse_raw_data(evt_log.get('data'))
+                self.analyze(data, "log", trans_hash, int(evt_log.get('blockNumber'), 16))
+            except ValueError:
+                pass
+            except Exception as e:
+                self.logger.error(f"Unexpected error found parsing event log data on trans '{trans_hash}': {e}")
+                self.logger.error_exit()
+
+        self.stats.count_logs(len(logs))
+
+        return
 
-            if self.tracked_contracts.get(contract_addr) or not contract_addr:
-                return
 
-            # first time seeing possible contract, confirm its one and get first N data storage fields
-            if self.eth_scan.get_proxy_code_at(contract_addr) != '0x':
-                hex_data = ""
-                for pos in range(self.contract_pos):
-                    hex_data += self.eth_scan.get_proxy_storage_position_at(
-                                                address=contract_addr,
-                                                position=hex(pos)
-                                            )
+    # attempt to extract files from contract's storage
+    def extract_from_contract(self, trans, hash_id):
+        # get possible contract address
+        contract_addr = trans.get('to') or trans.get('creates')
 
-                data = self.parse_raw_data(hex_data)
-                self.search_and_extract(data, "contract", hash_id)
+        if self.tracked_contracts.get(contract_addr) or not contract_addr:
+            return
 
-                # mark as traversed
-                self.tracked_contracts[contract_addr] = True
+        # first time seeing possible contract, confirm its one and get first N data storage fields
+        if self.api.get_proxy_code_at(contract_addr) != '0x':
+            # decode every 32-byte position (queried concurrently) straight into its slot of a preallocated buffer
+            data = bytearray(32 * self.contract_pos)
+            with memoryview(data) as view:
+                positions = self.api.get_proxy_storage_positions_at(self.contract_pos, contract_addr)
+                for pos, hex_data in enumerate(positions):
+                    view[32 * pos:32 * (pos + 1)] = self.parse_raw_data(hex_data)
 
+            self.analyze(data, "contract", hash_id, int(trans.get('blockNumber'), 16))
 
-        # call generic transaction iter func passing stub
-        self.iterate_over_transactions(get_from_contract_stub, blk_info)
+            # mark as traversed
+            self.tracked_contracts[contract_addr] = True
 
         return
 
 
-    # generic 'safe' iterations over transaction
-    def iterate_over_transactions(self, func, blk_info):
+    # generic 'safe' iteration over (streamed) block's transactions, running every extraction stub on them
+    def iterate_over_transactions(self, blk_info):
         # iterate all over the transactions from that block
-        block_trans = blk_info.get('transactions')
-        for trans_obj in block_trans:
+        for trans_obj in blk_info:
             trans_hash = trans_obj['hash']
 
-            try:
-                # here goes stub being called
-                func(trans_obj, trans_hash)
-            except ValueError as e:
-                # skip when no input data is found
-                pass
-            except Exception as e:
-                self.logger.error(f"Unexpected error found parsing input data on trans '{trans_hash}': {e}")
-                self.logger.error_exit()
-            finally:
-                if self.trans_file:
-                    # save details into transaction file
-                    self.trans_file.write(f"[*] Transaction {trans_hash}\n")
-                    for k,v in trans_obj.items():
-                        if k != 'hash':
-                            self.trans_file.write(f"\t[-] {k}: {v}\n")
-                    self.trans_file.write("\n")
-
-                self.stats.trans_c += 1
+            for func in self.trans_stubs:
+                try:
+                    # here goes stub being called
+                    func(trans_obj, trans_hash)
+                except ValueError as e:
+                    # skip when no input data is found
+                    pass
+                except Exception as e:
+                    self.logger.error(f"Unexpected error found parsing data on trans '{trans_hash}': {e}")
+                    self.logger.error_exit()
+
+            if self.trans_file:
+                # save details into transaction file (on one write, as jobs share it)
+                trans_details = f"[*] Transaction {trans_hash}\n"
+                for k,v in trans_obj.items():
+                    # hex fields come as views over raw ascii bytes
+                    if isinstance(v, memoryview):
+                        v = "0x" + str(v, "ascii")
+                    if k != 'hash':
+                        trans_details += f"\t[-] {k}: {v}\n"
+                self.trans_file.write(trans_details + "\n")
+
+            if self.trans_stubs:
+                self.stats.count_transaction()
+
+        # classify block's 'to' addresses all at once
+        if self.trans_addr:
+            self.classify_trans_addresses()
 
         return
 
 
     # attempt to find files along recievers addresses
-    def search_in_trans_address(self, blk_info):
-        block_trans = blk_info.get('transactions')
-        for trans_obj in block_trans:
-            trans_hash = trans_obj['hash']
-            from_addr = trans_obj['from']
+    def search_in_trans_address(self, trans, hash_id):
+        from_addr = trans['from']
 
-            try:
-                # 'to' address is empty when creating a contract (uses field 'creates')
-                if not trans_obj['to']:
-                    continue
+        # 'to' address is empty when creating a contract (uses field 'creates')
+        if not trans['to']:
+            return
 
-                # parse 'to' addresses into bytes and search for file header or magic bytes
-                data = self.parse_raw_data(trans_obj['to'])
-                file_fmt = magic.from_buffer(data)
+        # parse 'to' addresses into bytes, searched for file header or magic bytes along the rest of block's
+        self.trans_addr.append((from_addr, hash_id, self.parse_raw_data(trans['to'])))
 
-                # if we got file header or magic bytes at head of file...
-                if not self.ignored_format(file_fmt):
-                    # and it's first time finding this 'from' address
-                    if not self.tracked_addr.get(from_addr):
-                        self.tracked_addr[from_addr] = b""
-                        self.logger.info(f"Found file header in transaction '{trans_hash}' "\
-                                            f"coming from address '{from_addr}'...")
+        return
 
-                # check if it's coming from already tracked address and append data
-                if self.tracked_addr.get(from_addr):
-                    self.tracked_addr[from_addr] += data
-                    self.logger.info(f"Adding more data to possible file from address '{from_addr}'...")
 
-            except Exception as e:
-                self.logger.error(f"Unexpected error found parsing 'to' address data on trans '{trans_hash}': {e}")
-                self.logger.error_exit()
+    # search for file header or magic bytes on every 'to' address seen (in order), tracking 'from' addresses
+    def classify_trans_addresses(self):
+        try:
+            file_fmts = self.classifier.classify_batch([data for _, _, data in self.trans_addr])
+        except Exception as e:
+            self.logger.error(f"Unexpected error found classifying transaction addresses: {e}")
+            self.logger.error_exit()
+
+        for (from_addr, hash_id, data), file_fmt in zip(self.trans_addr, file_fmts):
+            # if we got file header or magic bytes at head of file...
+            if not self.ignored_format(file_fmt):
+                # and it's first time finding this 'from' address
+                if not self.tracked_addr.get(from_addr):
+                    self.tracked_addr[from_addr] = b""
+                    self.logger.info(f"Found file header in transaction '{hash_id}' "\
+                                        f"coming from address '{from_addr}'...")
+
+            # check if it's coming from already tracked address and append data
+            if self.tracked_addr.get(from_addr) is not None:
+                self.tracked_addr[from_addr] += data
+                self.logger.info(f"Adding more data to possible file from address '{from_addr}'...",
+                                    key = "address data")
+
+        self.trans_addr = []
+
+        return
+
+
+    # analyze payload on scheduler's workers (or right away if there's no scheduler)
+    def analyze(self, raw_data, ext_type, id, blk_id = None):
+        if self.scheduler:
+            self.scheduler.submit(self.safe_search_and_extract, raw_data, ext_type, id, blk_id)
+        else:
+            self.search_and_extract(raw_data, ext_type, id, blk_id)
+
+        return
+
+
+    # 'safe' search and extraction for workers, stopping the scan on unexpected errors
+    def safe_search_and_extract(self, raw_data, ext_type, id, blk_id = None):
+        try:
+            self.search_and_extract(raw_data, ext_type, id, blk_id)
+        except ValueError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Unexpected error found analyzing data from {ext_type} '{id}': {e}")
+            self.logger.error_exit()
 
         return
 
 
     # main file format recognition and extraction method
-    def search_and_extract(self, raw_data, ext_type, id):
+    def search_and_extract(self, raw_data, ext_type, id, blk_id = None):
         # double format string: data format, trans/block phrase, id and outfile
         gen_msg = "Found interesting file ({{}}) {} '{{}}' ({{}}), extracted to '{{}}'..."
 
@@ -202,53 +272,80 @@ class Extractor():
             log_msg = gen_msg.format("on block")
         elif ext_type == "contract":
             log_msg = gen_msg.format("on contract data at")
+        elif ext_type == "address":
+            log_msg = gen_msg.format("on data coming from address")
+        elif ext_type == "log":
+            log_msg = gen_msg.format("on event log of transaction")
         else:
             raise Exception("invalid extraction type!")
 
+        self.stats.count_payload(len(raw_data))
+
+        # record payload for later reanalysis (if enabled)
+        if self.corpus:
+            self.corpus.add(raw_data, ext_type, id, blk_id, self.network)
+
         # if-elif order MATTERS here (from most accurate method to lesser one)
         # (if embedded enabled) check for embedded files inside data via binwalk
-        if self.embedded and (emb_files := self.get_embedded_files(raw_data, id)):
-            for file_n, file_fmt in emb_files.items():
-                self.logger.info_file(log_msg.format(file_fmt, id, "found embedded", file_n))
+        if self.embedded and (files := self.get_embedded_files(raw_data, id)):
+            detector, method = "embedded", "found embedded"
 
         # (default method) check for magic bytes or file header and haven't found anything via binwalk
-        elif self.file_header and (header_f := self.get_file_via_headers(raw_data)):
-            file = header_f.popitem()
-            self.logger.info_file(log_msg.format(file[1], id, "via file header", file[0]))
+        elif self.file_header and (files := self.get_file_via_headers(raw_data)):
+            detector, method = "file_header", "via file header"
+
+        # (default method) no file header at start of data, but common formats could still be further inside
+        elif self.file_header and (files := self.get_carved_files(raw_data)):
+            detector, method = "carved", "carved at offset"
 
         # (if dump strings enabled) haven't found anything via binwalk nor file headers
-        elif self.strings and (strings := self.dump_strings(raw_data)):
-            file = strings.popitem()
-            self.logger.info_file(log_msg.format(file[1], id, "via dumped strings", file[0]))
+        elif self.strings and (files := self.dump_strings(raw_data)):
+            detector, method = "strings", "via dumped strings"
 
         # (if entropy search enabled) there's still the (slim) chance that utf-8 text could be hiding in that data
-        elif self.ent_limits and (valid_file := self.get_file_via_entropy(raw_data)):
-            file = valid_file.popitem()
-            self.logger.info_file(log_msg.format(file[1], id, "via entropy calc", file[0]))
+        elif self.ent_limits and (files := self.get_file_via_entropy(raw_data)):
+            detector, method = "entropy", "via entropy calc"
+
+        else:
+            return
+
+        # store found files and log them
+        for file_data, file_fmt in files:
+            finding = self.output.store(file_data, file_fmt, detector, ext_type, id, blk_id, self.network)
+            self.logger.info_file(log_msg.format(file_fmt, id, method, finding.path))
 
         return
 
 
-    # search and extract embedded files in data via binwalk
+    # search and carve embedded files in data (in-process for common formats, then via binwalk for
+    # whatever is left if carved files don't cover data), returns list of (data, file format)
     def get_embedded_files(self, raw_data, id):
-        # create tmp file for usage with binwalk api
-        tmp_n = f"tmp_{id}"
+        spans = self.carver.carve(raw_data)
+        files = [(file_data, file_fmt) for _, file_data, file_fmt in spans if not self.ignored_format(file_fmt)]
+
+        # only a few bytes around carved files (e.g. a function selector), nothing else for binwalk
+        if spans and len(raw_data) - sum(len(file_data) for _, file_data, _ in spans) <= self.CARVE_GAP:
+            return files
+
+        # create tmp file for usage with binwalk api, on an absolute path as binwalk moves around
+        # working dir (same id could be analyzed on many threads)
+        tmp_n = os.path.join(self.ext_dir, f"tmp_{id}_{threading.get_ident()}")
         with open(tmp_n, "+wb") as tmp_file:
             tmp_file.write(raw_data)
 
-        files_found = {}
-        ignored_file_found = False
+        files_found = list(files)
 
-        # search and extract files
-        binwalk_res = binwalk.scan(tmp_n, signature=True, quiet=True, extract=True,
-                                    dd='.*', directory=self.ext_dir)
+        # search and extract files, one scan at a time as working dir is shared by whole process
+        with self.BINWALK_LOCK:
+            binwalk_res = binwalk.scan(tmp_n, signature=True, quiet=True, extract=True,
+                                        dd='.*', directory=self.ext_dir)
 
         # traverse results
         for module in binwalk_res:
             for result in module.results:
-                # check that file format is not one of ignored formats
-                if self.ignored_format(result.description):
-                    ignored_file_found = True
+                # check that file format is not one of ignored formats, nor an already carved file
+                if self.ignored_format(result.description) or \
+                any(start <= result.offset < start + len(file_data) for start, file_data, _ in spans):
                     continue
 
                 files_n = []
@@ -265,73 +362,60 @@ class Extractor():
                         files_n.append(extracted.files[0])
 
                     for file in files_n:
-                        # change name to our regular name convention
-                        ext_file = self.ext_file_name.format(self.stats.files_c)
-                        os.rename(file, ext_file)
-
-                        self.stats.files_c += 1
-                        files_found[ext_file] = result.description
+                        # keep file contents, output layer will store them
+                        with open(file, "rb") as ext_file:
+                            files_found.append((ext_file.read(), result.description))
 
-        # remove tmp data file and binwalk-created dir if files get extracted
+        # remove tmp data file and binwalk-created dir (if any)
         os.remove(tmp_n)
-        if files_found or ignored_file_found:
-            shutil.rmtree(f"{self.ext_dir}/_{tmp_n}.extracted")
+        shutil.rmtree(os.path.join(self.ext_dir, f"_{os.path.basename(tmp_n)}.extracted"), ignore_errors = True)
 
         return files_found
 
 
-    # search and extract file via magic bytes or file header
+    # carve common file formats found at any offset of data
+    def get_carved_files(self, raw_data):
+        return [(file_data, file_fmt) for _, file_data, file_fmt in self.carver.carve(raw_data)
+                    if not self.ignored_format(file_fmt)]
+
+
+    # search file via magic bytes or file header
     def get_file_via_headers(self, raw_data):
-        found_file = {}
+        found_file = []
 
         # get file format with 'file' linux util
-        file_fmt = magic.from_buffer(raw_data)
+        file_fmt = self.classifier.classify(raw_data)
         # if not in ignored file format
         if not self.ignored_format(file_fmt):
-            ext_file = self.ext_file_name.format(self.stats.files_c)
-
-            # and write file into dropped files folder
-            with open(ext_file, "+wb") as tmp_file:
-                tmp_file.write(raw_data)
-
-                self.stats.files_c += 1
-                found_file[ext_file] = file_fmt
+            found_file.append((raw_data, file_fmt))
 
         return found_file
 
 
-    # search and extract ascii strings into file
+    # search ascii strings and dump them into one file
     def dump_strings(self, raw_data):
-        found_strings = {}
+        found_strings = []
 
-        # strings were found
+        # strings were found, save all into one file
         if strings := self.get_strings(raw_data):
-            ext_file = self.ext_file_name.format(self.stats.files_c)
-            # save all into one file
-            with open(ext_file, "+w") as str_file:
-                for f_str in strings:
-                    str_file.write(f_str + "\n")
-
-            self.stats.files_c += 1
-            found_strings[ext_file] = "ASCII Strings"
+            str_data = "".join(f_str + "\n" for f_str in strings).encode()
+            found_strings.append((str_data, "ASCII Strings"))
 
         return found_strings
 
 
-    # calc entropy and extract file if entropy is between limits
+    # calc entropy over a sliding window and keep every region of data with entropy between limits
     def get_file_via_entropy(self, raw_data):
-        valid_files = {}
-        entropy = self.stats.entropy(raw_data)
+        valid_files = []
+        regions = self.stats.entropy_regions(raw_data, self.ent_window,
+                                                self.ent_limits['min'], self.ent_limits['max'])
 
-        # range in given entropy limits
-        if entropy >= self.ent_limits['min'] and entropy <= self.ent_limits['max']:
-            ext_file = self.ext_file_name.format(self.stats.files_c)
-            # save all data into file
-            with open(ext_file, "+wb") as file:
-                file.write(raw_data)
-
-            self.stats.files_c += 1
-            valid_files[ext_file] = self.ent_limits['type']
+        # keep whole data if it's all in range, otherwise only views over its regions
+        for start, end in regions:
+            if end - start == len(raw_data):
+                valid_files.append((raw_data, self.ent_limits['type']))
+            else:
+                valid_files.append((memoryview(raw_data)[start:end], self.ent_limits['type']))
 
         return valid_files
 
@@ -426,13 +510,52 @@ class Extractor():
         return args.file_header
 
 
-    # parse raw api-given data into bytes
+    # parse raw api-given hex data into bytes, only stripping its '0x' prefix
     def parse_raw_data(self, raw_hex_data):
-        data = bytes.fromhex(raw_hex_data.replace('0x', ''))
+        # ascii strings get sliced, while raw buffers (e.g. streamed inputs) are only viewed
+        if isinstance(raw_hex_data, str):
+            if raw_hex_data.startswith('0x'):
+                raw_hex_data = raw_hex_data[2:]
+            return a2b_hex(raw_hex_data)
+
+        with memoryview(raw_hex_data) as view:
+            if view[:2] == b'0x':
+                view = view[2:]
+            data = a2b_hex(view)
 
         return data
 
 
+    # get extraction stubs for every transaction according to enabled modes
+    def get_trans_stubs(self, args):
+        stubs = []
+        if args.transactions:
+            stubs.append(self.extract_from_transaction)
+        if args.addresses:
+            stubs.append(self.search_in_trans_address)
+        if args.contracts:
+            stubs.append(self.extract_from_contract)
+
+        return stubs
+
+
+    # get transaction fields needed by enabled modes (None for all of them)
+    def get_trans_fields(self, args):
+        # saved transactions get all of their fields
+        if args.save_transactions:
+            return None
+
+        fields = set()
+        if args.transactions:
+            fields |= {'hash', 'blockNumber', 'input'}
+        if args.addresses:
+            fields |= {'hash', 'from', 'to'}
+        if args.contracts:
+            fields |= {'hash', 'blockNumber', 'to', 'creates'}
+
+        return fields
+
+
     # check ignored file format arg
     def get_ignored_fmts(self, ign_fmt):
         # ignore-all file formats wildcard enabled
@@ -447,10 +570,3 @@ class Extractor():
         ign_fmt = ['^data$', '^empty$'] + list(map(str.lower, ign_fmt))
 
         return ign_fmt
-
-
-    # set extracted file path
-    def get_ext_file_path(self, ext_dir):
-        ext_fname = self.EXT_FILE_NAME.format(ext_dir)
-
-        return ext_fname
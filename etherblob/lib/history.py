@@ -0,0 +1,149 @@
+import json
+import os
+
+class History():
+    HISTORY_CACHE = ".history_{}"       # default cache dir name (one per network)
+    PAGE_SIZE = 10000                   # max transactions returned by a query (paging can't go past them)
+    FIELDS = ('hash', 'blockNumber', 'transactionIndex', 'from', 'to', 'input', 'contractAddress')
+
+    # transaction history of given addresses over a block range via account txlist queries (addresses
+    # queried concurrently, each one walked in block order), cached on disk per address so later scans
+    # only query the blocks they didn't cover yet
+    def __init__(self, job):
+        self.logger = job.logger
+        self.api = job.api
+        self.stop_event = job.stop_event
+        self.wait_retry = job.wait_retry
+        self.cache_dir = self.get_cache_dir(job.args.history_cache, job.network)
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+
+
+    # get every transaction sent from/to given addresses on block range (once each, in chain order),
+    # as fetched blocks would give them, returns None if engine was stopped meanwhile
+    def get_transactions(self, addresses, s_blk, e_blk):
+        # blocks past chain head can't be cached as seen yet
+        head = min(e_blk, self.get_head(e_blk))
+
+        trans = {}
+        for addr_trans in self.api.pool.map(lambda addr: self.get_address_trans(addr, s_blk, e_blk, head),
+                                            addresses):
+            if addr_trans is None:
+                return None
+            for tx in addr_trans:
+                trans[tx['hash']] = tx
+
+        ordered = sorted(trans.values(), key = lambda tx: (int(tx['blockNumber']), int(tx['transactionIndex'])))
+
+        return [self.to_block_trans(tx) for tx in ordered]
+
+
+    # get address' transactions on block range, querying only blocks not on its cache
+    def get_address_trans(self, addr, s_blk, e_blk, head):
+        cached = self.load(addr)
+        c_start, c_end = cached['range'] if cached else (None, None)
+
+        # extend cached range if requested one overlaps or touches it, otherwise start over
+        if cached and s_blk <= c_end + 1 and e_blk >= c_start - 1:
+            trans = cached['transactions']
+            missing = [(s_blk, c_start - 1), (c_end + 1, e_blk)]
+            c_start, c_end = min(s_blk, c_start), max(head, c_end)
+        else:
+            trans = []
+            missing = [(s_blk, e_blk)]
+            c_start, c_end = s_blk, head
+
+        for m_start, m_end in missing:
+            if m_start > m_end:
+                continue
+            if (new_trans := self.fetch(addr, m_start, m_end)) is None:
+                return None
+            trans += new_trans
+            self.logger.info(f"Got {len(new_trans)} transactions of address '{addr}' "\
+                                f"between blocks '{m_start}' and '{m_end}'...")
+
+        if c_start <= c_end:
+            self.save(addr, {'range': [c_start, c_end], 'transactions': trans})
+
+        return [tx for tx in trans if s_blk <= int(tx['blockNumber']) <= e_blk]
+
+
+    # query address' transactions on block range (retrying until done), moving range's start up to the
+    # last block of every full page as paging can't go past a few of them
+    def fetch(self, addr, s_blk, e_blk):
+        trans = {}
+
+        while not self.stop_event.is_set():
+            try:
+                page = self.api.get_account_txlist(addr, s_blk, e_blk, 1, self.PAGE_SIZE)
+            except Exception as e:
+                self.wait_retry(s_blk, e)
+                continue
+
+            # last block may be cut on a full page, it gets queried again (deduplicating by hash)
+            for tx in page:
+                trans[tx['hash']] = {k: tx.get(k) for k in self.FIELDS}
+            if len(page) < self.PAGE_SIZE:
+                return list(trans.values())
+
+            last_blk = int(page[-1]['blockNumber'])
+            if last_blk == s_blk:
+                self.logger.warning(f"Too many transactions of address '{addr}' on block '{s_blk}', "\
+                                    f"only the first {self.PAGE_SIZE} are searched...")
+                last_blk += 1
+            s_blk = last_blk
+
+        return None
+
+
+    # get chain head (retrying until done), or given block if engine was stopped meanwhile
+    def get_head(self, blk_id):
+        while not self.stop_event.is_set():
+            try:
+                return self.api.get_proxy_block_number()
+            except Exception as e:
+                self.wait_retry(blk_id, e)
+
+        return blk_id
+
+
+    # convert txlist transaction into the shape of block transactions (hex block id and contract
+    # creation's address on 'creates', with no 'to' address)
+    def to_block_trans(self, tx):
+        return {
+            'hash': tx['hash'],
+            'blockNumber': hex(int(tx['blockNumber'])),
+            'from': tx['from'],
+            'to': tx['to'] or None,
+            'creates': tx['contractAddress'] or None,
+            'input': tx['input']
+        }
+
+
+    # load address' cached transactions (None if not cached)
+    def load(self, addr):
+        cache_path = os.path.join(self.cache_dir, f"{addr}.json")
+        if not os.path.exists(cache_path):
+            return None
+
+        with open(cache_path, "r") as cache_file:
+            return json.load(cache_file)
+
+
+    # save address' transactions into cache (replacing it so a killed run can't corrupt it)
+    def save(self, addr, cached):
+        cache_path = os.path.join(self.cache_dir, f"{addr}.json")
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(cached, cache_file)
+        os.replace(tmp_path, cache_path)
+
+        return
+
+
+    # get cache dir name
+    def get_cache_dir(self, cache_dir, net):
+        if cache_dir == "default_history_cache":
+            cache_dir = self.HISTORY_CACHE.format(net)
+
+        return os.path.abspath(cache_dir)
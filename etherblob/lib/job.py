@@ -0,0 +1,409 @@
+import copy
+import itertools
+from time import time
+from etherblob.lib.api import Api
+from etherblob.lib.extractor import Extractor
+from etherblob.lib.history import History
+from etherblob.lib.sampler import Sampler
+from etherblob.utils.errors import FatalError
+
+
+class Job():
+    MAX_TIME = 2**8                         # max time to retry querying again (accept 8 errors then stop increasing time)
+    REORG_DEPTH = 6                         # max blocks re-checked on chain reorgs when following chain head
+    BLOCK_TIME = 12                         # initial estimate of secs between blocks when following chain head
+    BLOCK_TIME_WEIGHT = 0.2                 # weight of newly observed block times on estimate
+    MIN_POLL_TIME = 1                       # min secs between chain head polls
+    MAX_POLL_TIME = 16                      # max secs between chain head polls (when next block is late)
+    LOGS_LIMIT = 1000                       # max event logs returned by a query
+    LOGS_WINDOW = 128                       # initial blocks per event logs query
+    MAX_LOGS_WINDOW = 2**14                 # max blocks per event logs query (while logs are sparse)
+
+    # fetch stage of one (network, block range) job, with its own api client (and rate limits) and
+    # extractor, feeding payloads into the analysis, output and stats shared by every job of engine
+    def __init__(self, blob_exp, api_key, network, start_block, end_block, rate_limit):
+        # own copy of args for this job's network, range and rate limit
+        self.args = copy.copy(blob_exp.args)
+        self.args.network, self.args.start_block, self.args.end_block = network, start_block, end_block
+        self.args.rate_limit = rate_limit
+        self.network = network
+
+        # copy shared objects
+        self.logger = blob_exp.logger
+        self.ext_dir = blob_exp.ext_dir
+        self.trans_file = blob_exp.trans_file
+        self.stop_event = blob_exp.stop_event
+        self.corpus = blob_exp.corpus
+        self.stats = blob_exp.stats
+        self.output = blob_exp.output
+        self.scheduler = blob_exp.scheduler
+
+        # get api client, and timestamp index of this network (shared with other jobs on it)
+        self.api = self.init_api(api_key, self.args)
+        self.ts_index = blob_exp.ts_indexes[network]
+
+        # resolve block ids from timestamp if enabled
+        self.args.start_block, self.args.end_block = self.resolve_blk_id(self.args.start_block,
+                                                                        self.args.end_block,
+                                                                        self.args.timestamps
+                                                                    )
+        # blocks are only walked if a mode needs them (event logs are fetched by ranges, and only
+        # given addresses' transactions are fetched on history mode)
+        self.block_modes = self.args.blocks or (not self.args.history and (self.args.transactions
+                            or self.args.addresses or self.args.contracts))
+
+        # copy starting block id, blocks to process and last retry's time power base
+        self.block_id = self.args.start_block
+        self.total_blocks = self.args.end_block - self.args.start_block + 1
+        self.last_retry_t = 2
+
+        # follow mode state: chain head (and when it was seen), block time estimate,
+        # current poll interval and hashes of last processed blocks
+        self.head_id = 0
+        self.head_t = time()
+        self.block_t = self.BLOCK_TIME
+        self.poll_t = self.MIN_POLL_TIME
+        self.recent_hashes = {}
+
+        self.extractor = Extractor(self)
+        self.history = History(self) if self.args.history else None
+
+        # if sampling, only walk a stratified subset of range (starting from first sampled block)
+        self.sampler = None
+        if self.args.sample:
+            self.sampler = Sampler(self)
+            self.total_blocks = len(self.sampler.samples)
+            self.block_id = self.sampler.next_block(self.args.start_block - 1)
+
+
+    # walk job's range for every enabled mode until done or engine is stopped
+    def run(self):
+        if self.block_modes:
+            self.walk_blocks()
+        if self.history:
+            self.walk_history()
+        if self.args.logs:
+            self.walk_logs()
+
+        return
+
+
+    # walk job's range (and chain head if following it) block by block
+    def walk_blocks(self):
+        while not self.stop_event.is_set():
+            # past ending block either stop or, if following chain, wait for its head to get there
+            if self.block_id > self.args.end_block:
+                if not self.args.follow:
+                    break
+                if not self.wait_for_block():
+                    continue
+
+            # process block (engine stopped meanwhile if nothing comes back)
+            if self.sampler:
+                self.sampler.before_block()
+            if (header := self.process_block(self.block_id)) is None:
+                break
+            if self.args.follow:
+                self.check_reorg(header)
+            if self.sampler:
+                self.scheduler.join()
+                self.sampler.record_block(self.block_id)
+
+            self.block_id = self.next_block()
+            self.stats.count_block()
+
+            # show cycle stats
+            self.stats.show_cycle_metrics()
+
+        return
+
+
+    # walk transactions of given addresses on job's range (instead of every block), block by block
+    def walk_history(self):
+        self.logger.info(f"Fetching transaction history of {len(self.args.history)} addresses on '{self.network}'...")
+        if (trans := self.history.get_transactions(self.args.history, self.args.start_block,
+                                                    self.args.end_block)) is None:
+            return
+
+        last_blk = self.args.start_block - 1
+        for blk_trans in self.group_by_block(trans):
+            if self.stop_event.is_set():
+                break
+            self.extractor.iterate_over_transactions(blk_trans)
+
+            # blocks with no transactions of given addresses are skipped too
+            blk_id = int(blk_trans[0]['blockNumber'], 16)
+            if not self.block_modes:
+                self.stats.count_block(blk_id - last_blk)
+                self.stats.show_cycle_metrics()
+            last_blk = blk_id
+
+        if not self.block_modes and not self.stop_event.is_set():
+            self.stats.count_block(self.args.end_block - last_blk)
+
+        return
+
+
+    # split transactions (in chain order) into lists of the ones on same block
+    def group_by_block(self, trans):
+        blk_trans = []
+        for tx in trans:
+            if blk_trans and blk_trans[-1]['blockNumber'] != tx['blockNumber']:
+                yield blk_trans
+                blk_trans = []
+            blk_trans.append(tx)
+
+        if blk_trans:
+            yield blk_trans
+
+        return
+
+
+    # walk job's range fetching event logs of many blocks per query, splitting windows with too many logs
+    # to be returned at once and growing them back while logs are sparse
+    def walk_logs(self):
+        s_blk, window = self.args.start_block, self.LOGS_WINDOW
+
+        while s_blk <= self.args.end_block and not self.stop_event.is_set():
+            e_blk = min(s_blk + window - 1, self.args.end_block)
+            if (logs := self.get_logs(s_blk, e_blk)) is None:
+                break
+
+            # window got truncated, split it (or page through block if it's only one)
+            if len(logs) >= self.LOGS_LIMIT:
+                if e_blk > s_blk:
+                    window = (e_blk - s_blk + 1) // 2
+                    continue
+                if (logs := self.get_block_logs(s_blk)) is None:
+                    break
+
+            self.extractor.extract_from_logs(logs)
+            if not self.block_modes:
+                self.stats.count_block(e_blk - s_blk + 1)
+                self.stats.show_cycle_metrics()
+
+            s_blk = e_blk + 1
+            if len(logs) < self.LOGS_LIMIT // 4:
+                window = min(2 * window, self.MAX_LOGS_WINDOW)
+
+        return
+
+
+    # get event logs of block range (retrying until done)
+    def get_logs(self, s_blk, e_blk, page = None):
+        while not self.stop_event.is_set():
+            try:
+                logs = self.api.get_logs(s_blk, e_blk, page, self.LOGS_LIMIT)
+                self.last_retry_t = 2
+                return logs
+            except Exception as e:
+                self.wait_retry(s_blk, e)
+
+        return None
+
+
+    # get every event log of a single block, page by page
+    def get_block_logs(self, blk_id):
+        logs = []
+
+        for page in itertools.count(1):
+            if (page_logs := self.get_logs(blk_id, blk_id, page)) is None:
+                return None
+            logs += page_logs
+            if len(page_logs) < self.LOGS_LIMIT:
+                return logs
+
+
+    # extract files from transactions addresses (if enabled) and persist timestamp index with newly seen blocks
+    def finish(self):
+        if self.args.addresses:
+            self.extractor.extract_from_trans_address()
+        self.ts_index.save()
+
+        return
+
+
+    # get next block to process (next sampled one if sampling)
+    def next_block(self):
+        if self.sampler:
+            return self.sampler.next_block(self.block_id)
+
+        return self.block_id + 1
+
+
+    # initialize api client choosing network, concurrency, timeouts and rate limit from args
+    def init_api(self, apikey, args):
+        return Api(apikey, args.network, args.concurrency, args.timeouts, args.rate_limit)
+
+
+    # fetch block while streaming its transactions through every transaction extraction mode
+    # enabled, then search on block fields (retrying until done), returns block fields
+    def process_block(self, blk_id):
+        trans_done = 0
+
+        while not self.stop_event.is_set():
+            block_info = None
+            try:
+                block_info = self.get_block_info(blk_id, trans_done)
+                self.extractor.iterate_over_transactions(block_info)
+                if self.args.blocks:
+                    self.extractor.extract_from_block(block_info.header)
+            except FatalError:
+                # already handled (and logged) error, api errors are retried below
+                raise
+            except Exception as e:
+                # on retry, resume from first transaction not processed yet (an attempt failing
+                # earlier on the stream than a previous one can't lower it)
+                if block_info:
+                    trans_done = max(trans_done, block_info.trans_c)
+                self.wait_retry(blk_id, e)
+                continue
+
+            # back to short retries after any success, so past errors don't slow down later ones
+            self.last_retry_t = 2
+
+            # record block's timestamp for future timestamp resolutions
+            self.ts_index.add(int(block_info.header.get('number'), 16),
+                                int(block_info.header.get('timestamp'), 16))
+
+            return block_info.header
+
+        return None
+
+
+    # get block information (as a stream of its transactions), asking only for what enabled modes need
+    def get_block_info(self, blk_id, trans_done = 0):
+        return self.api.stream_proxy_block_by_number(blk_id, trans_done,
+                                                    full_tx = bool(self.extractor.trans_stubs),
+                                                    fields = self.extractor.trans_fields)
+
+
+    # get block hash only (without its transactions)
+    def get_block_hash(self, blk_id):
+        while not self.stop_event.is_set():
+            try:
+                block_info = self.api.stream_proxy_block_by_number(blk_id, full_tx = False, fields = ())
+                for _ in block_info:
+                    pass
+                return block_info.header.get('hash')
+            except Exception as e:
+                self.wait_retry(blk_id, e)
+
+        return None
+
+
+    # wait for chain head to reach current block polling it at adaptive intervals (sleeping until
+    # next block is expected, backing off if it's late), returns if head got there
+    def wait_for_block(self):
+        try:
+            head = self.api.get_proxy_block_number()
+        except Exception as e:
+            self.wait_retry(self.block_id, e)
+            return False
+        self.last_retry_t = 2
+
+        now = time()
+        if head > self.head_id:
+            # update block time estimate with newly seen blocks
+            if self.head_id:
+                new_block_t = (now - self.head_t) / (head - self.head_id)
+                self.block_t += self.BLOCK_TIME_WEIGHT * (new_block_t - self.block_t)
+
+            self.head_id, self.head_t = head, now
+            self.poll_t = self.MIN_POLL_TIME
+
+            # grow blocks to process up to chain head
+            if (total_blocks := head - self.args.start_block + 1) > self.total_blocks:
+                self.stats.grow_total(total_blocks - self.total_blocks)
+                self.total_blocks = total_blocks
+
+        if head >= self.block_id:
+            return True
+
+        # idle until next block, persist what's pending meanwhile
+        self.scheduler.join()
+        self.ts_index.save()
+        self.output.flush()
+
+        # wait until next block is expected, or back off if it's already late
+        if (wait_t := self.head_t + self.block_t - now) < self.MIN_POLL_TIME:
+            wait_t = self.poll_t
+            self.poll_t = min(2 * self.poll_t, self.MAX_POLL_TIME)
+        self.stop_event.wait(wait_t)
+
+        return False
+
+
+    # check that block follows last processed one, otherwise re-check last blocks (shallow reorg)
+    # and process again the ones that got replaced
+    def check_reorg(self, header):
+        blk_id = int(header.get('number'), 16)
+        parent_hash = self.recent_hashes.get(blk_id - 1)
+
+        if parent_hash and parent_hash != header.get('parentHash'):
+            self.logger.warning(f"Chain reorg found at block '{blk_id}' on '{self.network}', re-checking last blocks...")
+
+            # walk back until finding a block that didn't change
+            replaced = []
+            for prev_id in range(blk_id - 1, blk_id - 1 - self.REORG_DEPTH, -1):
+                known_hash = self.recent_hashes.get(prev_id)
+                if not known_hash or known_hash == self.get_block_hash(prev_id):
+                    break
+                replaced.append(prev_id)
+
+            for prev_id in reversed(replaced):
+                self.logger.info(f"Processing replaced block '{prev_id}' again...")
+                if (prev_header := self.process_block(prev_id)) is None:
+                    return
+                self.recent_hashes[prev_id] = prev_header.get('hash')
+
+        # keep hashes only for the last blocks
+        self.recent_hashes[blk_id] = header.get('hash')
+        self.recent_hashes.pop(blk_id - self.REORG_DEPTH, None)
+
+        return
+
+
+    # log error found while querying block and wait before retrying
+    def wait_retry(self, blk_id, e):
+        self.logger.warning(f"Problem found while querying block '{blk_id}' on '{self.network}': {e}")
+        self.logger.info(f"Sleeping for {self.last_retry_t} [s] and retrying...")
+        self.stop_event.wait(self.last_retry_t)
+
+        # if error happens then retry again increasing the waiting time
+        if self.last_retry_t <= self.MAX_TIME:
+            self.last_retry_t = 2 * self.last_retry_t
+        else:
+            self.last_retry_t = self.MAX_TIME
+
+        return
+
+
+    # check and resolve timestamps if given
+    def resolve_blk_id(self, s_blk, e_blk, parse_as_ts):
+        if parse_as_ts:
+            try:
+                self.logger.info(f"Parsing blocks as timestamps on '{self.network}'...")
+                s_blk = self.get_block_by_timestamp(s_blk, 'before')
+                self.logger.info(f"Got starting block id '{s_blk}'!")
+
+                e_blk = self.get_block_by_timestamp(e_blk, 'after')
+                self.logger.info(f"Got ending block id '{e_blk}'!")
+                s_blk, e_blk = int(s_blk), int(e_blk)
+            except ValueError as e:
+                self.logger.error("Error found while passing block IDs to ints!")
+                self.logger.error_exit()
+            except Exception as e:
+                self.logger.error("Couldn't resolve timestamps to block ids!")
+                self.logger.error_exit()
+
+        return s_blk, e_blk
+
+
+    # resolve timestamp via local timestamp index, only querying the api on a miss
+    def get_block_by_timestamp(self, ts, closest):
+        if (blk_id := self.ts_index.lookup(ts, closest)) is not None:
+            self.logger.info(f"Resolved timestamp '{ts}' from local index...")
+            return blk_id
+
+        return self.api.get_block_number_by_timestamp(timestamp = ts, closest = closest)
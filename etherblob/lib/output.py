@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from hashlib import sha256
+from time import time
+from etherblob.lib.archive import Archive
+from etherblob.lib.stats import Stats
+
+# record for every file found on a scan
+Finding = namedtuple("Finding", ["network", "source", "block", "tx_hash", "address", "detector",
+                                "format", "size", "entropy", "sha256", "path"])
+
+
+class Output():
+    INDEX_NAME = "findings.sqlite"      # sqlite index of findings (inside extracted files' dir)
+    SHARD_LEVELS = 2                    # levels of sharded subdirs (2 hex chars each)
+    BATCH_SIZE = 256                    # max findings waiting to be inserted on the index
+    FLUSH_TIME = 5                      # max secs a finding waits to be inserted on the index
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS findings (
+            id INTEGER PRIMARY KEY,
+            network TEXT,
+            source TEXT NOT NULL,
+            block INTEGER,
+            tx_hash TEXT,
+            address TEXT,
+            detector TEXT NOT NULL,
+            format TEXT,
+            size INTEGER NOT NULL,
+            entropy REAL,
+            sha256 TEXT NOT NULL,
+            path TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS findings_block ON findings (network, block);
+        CREATE INDEX IF NOT EXISTS findings_sha256 ON findings (sha256);
+    """
+
+    # output layer for a scan, if index is disabled then findings are kept until taken
+    def __init__(self, blob_exp, index = True):
+        self.logger = blob_exp.logger
+        self.stats = blob_exp.stats
+        self.ext_dir = blob_exp.ext_dir
+
+        # findings not yet inserted on index and lock guarding them (and the counters)
+        self.pending = []
+        self.lock = threading.Lock()
+        self.last_flush = time()
+
+        # callables notified of every finding (from the scanning thread)
+        self.listeners = []
+
+        self.db = self.open_index(os.path.join(self.ext_dir, self.INDEX_NAME)) if index else None
+
+        # files go into rotating archives if enabled, otherwise into plain sharded dirs
+        self.archive = None
+        if blob_exp.args.archive_size:
+            self.archive = Archive(self.logger, self.ext_dir, blob_exp.args.archive_size * 2**20,
+                                    blob_exp.args.zstd)
+
+
+    # store file content-addressed and record it as a finding (tagged with network it came from, if any)
+    def store(self, data, file_fmt, detector, ext_type, id, blk_id = None, network = None):
+        digest = sha256(data).hexdigest()
+        path = self.write_file(data, digest)
+
+        # map generic id into its respective field according to source kind
+        tx_hash = id if ext_type in ("transaction", "contract", "log") else None
+        address = id if ext_type == "address" else None
+        if ext_type == "block":
+            blk_id = id
+
+        finding = Finding(network, ext_type, blk_id, tx_hash, address, detector, file_fmt,
+                            len(data), Stats.entropy(data), digest, path)
+        self.record(finding)
+
+        return finding
+
+
+    # queue finding for insertion on index, inserting whole batch when it's due
+    def record(self, finding):
+        with self.lock:
+            self.pending.append(finding)
+            self.stats.files_c += 1
+
+            if len(self.pending) >= self.BATCH_SIZE or (time() - self.last_flush) >= self.FLUSH_TIME:
+                self.flush_pending()
+
+        for listener in self.listeners:
+            listener(finding)
+
+        return
+
+
+    # insert every pending finding on the index
+    def flush(self):
+        with self.lock:
+            self.flush_pending()
+
+        return
+
+
+    # take (and forget) every pending finding, for outputs without index
+    def take(self):
+        with self.lock:
+            findings, self.pending = self.pending, []
+
+        return findings
+
+
+    # insert pending findings in one transaction (lock must be held)
+    def flush_pending(self):
+        if self.pending and self.db:
+            with self.db:
+                self.db.executemany("INSERT INTO findings (network, source, block, tx_hash, address, "\
+                                    "detector, format, size, entropy, sha256, path) "\
+                                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+            self.pending = []
+
+        self.last_flush = time()
+
+        return
+
+
+    # flush findings and close index (and archive)
+    def close(self):
+        if self.db:
+            self.flush()
+            self.db.close()
+        if self.archive:
+            self.archive.close()
+
+        return
+
+
+    # atomically write file under its hash on sharded subdirs or archive (if not already there)
+    def write_file(self, data, digest):
+        if self.archive:
+            return self.archive.add(data, digest)
+
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.SHARD_LEVELS)]
+        file_dir = os.path.join(self.ext_dir, *shards)
+        path = os.path.join(file_dir, digest)
+
+        if not os.path.exists(path):
+            os.makedirs(file_dir, exist_ok = True)
+
+            # unique tmp name so concurrent writers of the same content don't collide
+            tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+
+        return path
+
+
+    # open (and create if needed) sqlite index of findings
+    def open_index(self, db_path):
+        db = sqlite3.connect(db_path, check_same_thread = False)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.executescript(self.SCHEMA)
+
+        return db
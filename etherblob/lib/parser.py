@@ -0,0 +1,231 @@
+import json
+import re
+from etherblob.utils.errors import ApiError
+
+class BlockParser():
+    STRING_TOKENS = re.compile(rb'["\\]')           # tokens that end or escape inside a string
+    NESTED_TOKENS = re.compile(rb'["{}\[\]]')       # tokens that change nesting depth (or start a string)
+    SCALAR_END = re.compile(rb'[,}\]\s]')           # tokens that end a number, bool or null
+    WHITESPACE = b' \t\r\n'
+    HEX_FIELDS = ('input',)                         # hex string fields kept as undecoded views
+    COMPACT_SIZE = 2**16                            # min consumed bytes before compacting buffer
+
+    # incrementally parse an 'eth_getBlockByNumber' api response coming in chunks of bytes,
+    # yielding its transactions one at a time and leaving the rest of the fields on 'header'
+    # (only given transaction fields are decoded, all of them if None, none of them if empty)
+    def __init__(self, chunks, skip = 0, fields = None):
+        self.chunks = iter(chunks)
+        self.buf = bytearray()
+        self.pos = 0
+
+        # block fields (other than transactions) and transactions to skip (already parsed on a previous try)
+        self.header = {}
+        self.skip = skip
+        self.trans_c = 0
+        self.fields = fields
+
+
+    # iterate over block's transactions as they are parsed
+    def __iter__(self):
+        self.expect(b'{')
+        for key in self.iter_keys():
+            if key == 'result':
+                # failed queries send an error string (or null) as result
+                if self.peek() != b'{':
+                    raise ApiError(f"Invalid block result: {json.loads(self.read_raw())}")
+                yield from self.parse_block()
+            elif key == 'error':
+                raise ApiError(f"Error on block query: {json.loads(self.read_raw())}")
+            else:
+                self.read_raw()
+
+        # consume what's left of response (if anything), so its connection can be reused
+        for _ in self.chunks:
+            pass
+
+        return
+
+
+    # parse block object, yielding its transactions
+    def parse_block(self):
+        self.expect(b'{')
+        for key in self.iter_keys():
+            if key == 'transactions':
+                # skip whole array if no transaction field is needed
+                if self.fields is not None and not self.fields:
+                    self.read_raw(copy = False)
+                else:
+                    yield from self.parse_transactions()
+            else:
+                self.header[key] = json.loads(self.read_raw())
+
+        return
+
+
+    # parse transactions array, yielding every transaction
+    def parse_transactions(self):
+        self.expect(b'[')
+        if self.peek() == b']':
+            self.pos += 1
+            return
+
+        while True:
+            # full transaction objects or only their hashes
+            if self.peek() == b'{':
+                trans = self.parse_transaction()
+            else:
+                trans = {'hash': json.loads(self.read_raw())}
+
+            self.trans_c += 1
+            if self.trans_c > self.skip:
+                yield trans
+
+            if self.next_token() == b']':
+                break
+
+        return
+
+
+    # parse transaction object, hex fields are left as views over their raw bytes (without '0x' prefix)
+    def parse_transaction(self):
+        trans = {}
+
+        self.expect(b'{')
+        for key in self.iter_keys():
+            # skip (without copying) fields not needed
+            if self.fields is not None and key not in self.fields:
+                self.read_raw(copy = False)
+                continue
+
+            raw = self.read_raw()
+            if key in self.HEX_FIELDS and raw[:3] == b'"0x':
+                trans[key] = memoryview(raw)[3:-1]
+            else:
+                trans[key] = json.loads(raw)
+
+        return trans
+
+
+    # iterate over keys of the object being parsed, leaving position at their value
+    def iter_keys(self):
+        if self.peek() == b'}':
+            self.pos += 1
+            return
+
+        while True:
+            key = json.loads(self.read_raw())
+            self.expect(b':')
+            yield key
+
+            # caller must have consumed the value by now
+            if self.next_token() == b'}':
+                break
+
+        return
+
+
+    # get raw bytes of the next json value (if copy is enabled) and move past it
+    def read_raw(self, copy = True):
+        first = self.peek()
+        depth = 0
+        in_str = False
+
+        # current offset (relative to value start, as buffer can get compacted while reading)
+        rel = 1
+        if first == b'"':
+            in_str = True
+        elif first in (b'{', b'['):
+            depth = 1
+        else:
+            rel = 0
+
+        while True:
+            start = self.pos
+            if in_str:
+                m = self.STRING_TOKENS.search(self.buf, start + rel)
+            elif depth:
+                m = self.NESTED_TOKENS.search(self.buf, start + rel)
+            else:
+                m = self.SCALAR_END.search(self.buf, start + rel)
+
+            # value continues on following chunks
+            if not m:
+                rel = len(self.buf) - start
+                self.fill()
+                continue
+
+            token = m.group()
+            rel = m.end() - start
+            if not depth and not in_str:
+                # scalar ends right before its delimiter
+                rel -= 1
+                break
+            elif in_str:
+                if token == b'\\':
+                    # skip escaped char, making sure it's already there
+                    rel += 1
+                    while start + rel > len(self.buf):
+                        self.fill()
+                        start = self.pos
+                    continue
+                in_str = False
+                if not depth:
+                    break
+            elif token == b'"':
+                in_str = True
+            elif token in (b'{', b'['):
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    break
+
+        # copy value once out of the buffer
+        start = self.pos
+        raw = None
+        if copy:
+            with memoryview(self.buf) as view:
+                raw = view[start:start + rel].tobytes()
+        self.pos = start + rel
+
+        return raw
+
+
+    # get next non-whitespace byte without consuming it
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            self.fill()
+
+
+    # consume next non-whitespace byte
+    def next_token(self):
+        token = self.peek()
+        self.pos += 1
+
+        return token
+
+
+    # consume next non-whitespace byte, which must be the given one
+    def expect(self, token):
+        if (found := self.next_token()) != token:
+            raise ApiError(f"Malformed block response, expected {token} and found {found}!")
+
+        return
+
+
+    # read next chunk into buffer, dropping already consumed data
+    def fill(self):
+        if self.pos >= self.COMPACT_SIZE:
+            del self.buf[:self.pos]
+            self.pos = 0
+
+        try:
+            self.buf += next(self.chunks)
+        except StopIteration:
+            raise ApiError("Truncated block response!")
+
+        return
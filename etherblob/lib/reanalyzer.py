@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from etherblob.lib.corpus import CorpusReader
+from etherblob.lib.extractor import Extractor
+from etherblob.lib.output import Output
+from etherblob.lib.stats import Stats
+from etherblob.utils.log import Logger
+
+# per-process worker, set on pool's initializer
+worker = None
+
+
+class Reanalyzer():
+    CHUNK_SIZE = 1024       # corpus entries sent to a worker at once
+
+    # run detectors again over a recorded corpus (in parallel and without network)
+    def __init__(self, args):
+        self.args = args
+        self.logger = Logger(args)
+        self.ext_dir = self.create_ext_dir(args.output_dir)
+        self.workers = args.workers or os.cpu_count()
+        self.corpus = CorpusReader(args.corpus)
+
+        # findings found by workers are indexed here
+        self.stats = Stats(self)
+        self.output = Output(self)
+
+
+    # distribute corpus entries among workers and index their findings
+    def run(self):
+        entries_c = len(self.corpus)
+        self.logger.info(f"Reanalyzing {entries_c} payloads from '{self.args.corpus}' "\
+                            f"with {self.workers} workers...")
+
+        ranges = [(i, min(i + self.CHUNK_SIZE, entries_c)) for i in range(0, entries_c, self.CHUNK_SIZE)]
+        with ProcessPoolExecutor(self.workers, initializer = ReanalyzeWorker.init,
+                                    initargs = (self.args, self.ext_dir)) as pool:
+            for findings in pool.map(ReanalyzeWorker.analyze_range, ranges):
+                for finding in findings:
+                    self.output.record(finding)
+
+        self.output.close()
+        self.logger.info(f"Finished reanalyzing all {entries_c} payloads!")
+        self.logger.info(f"Total of extracted files: {self.stats.files_c}")
+        self.logger.close()
+
+        return
+
+
+    # create dir for extracted files
+    def create_ext_dir(self, ext_dir):
+        self.logger.info(f"Creating dir for files at '{ext_dir}'...")
+        try:
+            os.mkdir(ext_dir)
+        except Exception as e:
+            self.logger.error(f"Dir '{ext_dir}' already exists...")
+            self.logger.error_exit()
+
+        # absolute path, as binwalk changes working dir while other workers write files
+        return os.path.abspath(ext_dir)
+
+
+class ReanalyzeWorker():
+    # worker with its own extractor (files are written content-addressed into main process' dir, findings
+    # go back to main process)
+    def __init__(self, args, ext_dir):
+        self.args = args
+        self.ext_dir = ext_dir
+        self.corpus = None
+        self.trans_file = None
+        self.api = None
+        self.scheduler = None
+        self.network = None
+
+        # logs written right away (exit handlers don't run on pool processes, queued logs would be lost),
+        # without startup messages every worker would repeat
+        self.logger = Logger(args, queued = False)
+        with self.logger.quiet():
+            self.stats = Stats(self)
+            self.output = Output(self, index = False)
+            self.extractor = Extractor(self)
+        self.reader = CorpusReader(args.corpus)
+
+
+    # set up this process' worker
+    @staticmethod
+    def init(args, ext_dir):
+        global worker
+        worker = ReanalyzeWorker(args, ext_dir)
+
+        return
+
+
+    # run detector chain over a range of corpus entries, returning findings
+    @staticmethod
+    def analyze_range(entries):
+        for i in range(*entries):
+            ext_type, network, blk_id, id, data = worker.reader[i]
+
+            # findings keep network payload was recorded on
+            worker.extractor.network = network
+            try:
+                worker.extractor.search_and_extract(data, ext_type, id, blk_id)
+            except Exception as e:
+                worker.logger.error(f"Unexpected error found reanalyzing payload from '{id}': {e}")
+
+        return worker.output.take()
@@ -0,0 +1,156 @@
+import csv
+import random
+from bisect import bisect_right
+
+class Sampler():
+    REPORT_FILE = "sample_{}-{}.csv"        # per-bucket survey results file name (inside extracted files dir)
+    HEATMAP_SHADES = " .:-=+*#%@"           # heatmap shades, from no hits to highest bucket hit rate
+    HEATMAP_WIDTH = 64                      # buckets shown per heatmap row
+    TOP_BUCKETS = 10                        # buckets shown on ranking by hit rate
+
+    # stratified survey of a block range: K random blocks on every fixed-size bucket (reproducible via seed),
+    # keeping per-bucket hit rates and payload sizes
+    def __init__(self, blob_exp):
+        self.logger = blob_exp.logger
+        self.stats = blob_exp.stats
+        self.ext_dir = blob_exp.ext_dir
+        self.start_block = blob_exp.args.start_block
+        self.end_block = blob_exp.args.end_block
+        self.bucket_size = blob_exp.args.bucket_size
+
+        # pick every sampled block upfront (sorted, so blocks are still walked in order)
+        self.samples = self.pick_samples(blob_exp.args.sample, blob_exp.args.seed)
+        self.buckets = {}
+
+        # counters before current block was processed
+        self.last_counts = None
+
+        self.logger.info(f"Sampling {len(self.samples)} blocks ({blob_exp.args.sample} per "\
+                            f"{self.bucket_size}-block bucket, seed '{blob_exp.args.seed}')...")
+
+
+    # get next sampled block after given one (past ending block if there are no more)
+    def next_block(self, blk_id):
+        if (i := bisect_right(self.samples, blk_id)) < len(self.samples):
+            return self.samples[i]
+
+        return self.end_block + 1
+
+
+    # keep counters before processing a sampled block
+    def before_block(self):
+        self.last_counts = (self.stats.files_c, self.stats.payloads_c, self.stats.payload_bytes)
+
+        return
+
+
+    # account what was found on a sampled block to its bucket
+    def record_block(self, blk_id):
+        files_c, payloads_c, payload_bytes = (self.stats.files_c - self.last_counts[0],
+                                                self.stats.payloads_c - self.last_counts[1],
+                                                self.stats.payload_bytes - self.last_counts[2])
+
+        bucket = self.get_bucket(blk_id)
+        bucket['sampled'] += 1
+        bucket['hits'] += bool(files_c)
+        bucket['files'] += files_c
+        bucket['payloads'] += payloads_c
+        bucket['payload_bytes'] += payload_bytes
+        bucket['max_block_bytes'] = max(bucket['max_block_bytes'], payload_bytes)
+
+        return
+
+
+    # log heatmap and ranking of buckets by hit rate, and save every bucket's results
+    def report(self):
+        buckets = [self.buckets[b] for b in sorted(self.buckets)]
+        if not buckets:
+            self.logger.info("No sampled blocks were processed, skipping survey report...")
+            return
+
+        self.show_heatmap(buckets)
+
+        # rank buckets by hit rate (and findings count on ties)
+        self.logger.info(f"Top {self.TOP_BUCKETS} buckets by hit rate:")
+        ranked = sorted(buckets, key = lambda b: (self.hit_rate(b), b['files']), reverse = True)
+        for bucket in ranked[:self.TOP_BUCKETS]:
+            self.logger.info(f"Blocks {bucket['start']}-{bucket['end']}: {bucket['hits']}/{bucket['sampled']} "\
+                                f"sampled blocks with files ({self.hit_rate(bucket):.1%}), "\
+                                f"{bucket['files']} files, {bucket['payloads']} payloads "\
+                                f"(avg. {self.avg_payload_size(bucket):.0f} bytes)")
+
+        report_n = f"{self.ext_dir}/{self.REPORT_FILE.format(self.start_block, self.end_block)}"
+        with open(report_n, "w", newline = "") as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(["start_block", "end_block", "sampled", "hits", "hit_rate", "files",
+                                "payloads", "payload_bytes", "avg_payload_size", "max_block_bytes"])
+            for bucket in buckets:
+                writer.writerow([bucket['start'], bucket['end'], bucket['sampled'], bucket['hits'],
+                                    round(self.hit_rate(bucket), 4), bucket['files'], bucket['payloads'],
+                                    bucket['payload_bytes'], round(self.avg_payload_size(bucket), 1),
+                                    bucket['max_block_bytes']])
+
+        self.logger.info(f"Saved survey results of {len(buckets)} buckets to '{report_n}'...")
+
+        return
+
+
+    # log one shade per bucket (relative to highest hit rate), a row per many consecutive buckets
+    def show_heatmap(self, buckets):
+        max_rate = max(self.hit_rate(b) for b in buckets)
+        top_shade = len(self.HEATMAP_SHADES) - 1
+
+        self.logger.info(f"Hit rate heatmap ('{self.HEATMAP_SHADES[1]}' to '{self.HEATMAP_SHADES[-1]}' "\
+                            f"up to {max_rate:.1%}, one bucket of {self.bucket_size} blocks per char):")
+        for i in range(0, len(buckets), self.HEATMAP_WIDTH):
+            row = buckets[i:i + self.HEATMAP_WIDTH]
+            shades = "".join(self.HEATMAP_SHADES[0] if not b['hits'] else
+                                self.HEATMAP_SHADES[max(1, round(top_shade * self.hit_rate(b) / max_rate))]
+                                for b in row)
+            self.logger.info(f"{row[0]['start']:>12} |{shades}|")
+
+        return
+
+
+    # pick K random blocks on every bucket of range (or all of them on smaller buckets)
+    def pick_samples(self, k, seed):
+        rng = random.Random(seed)
+        samples = []
+
+        for s_blk in range(self.start_block, self.end_block + 1, self.bucket_size):
+            blocks = range(s_blk, min(s_blk + self.bucket_size, self.end_block + 1))
+            samples.extend(sorted(rng.sample(blocks, min(k, len(blocks)))))
+
+        return samples
+
+
+    # get (or create) bucket holding given block
+    def get_bucket(self, blk_id):
+        b_id = (blk_id - self.start_block) // self.bucket_size
+
+        if b_id not in self.buckets:
+            s_blk = self.start_block + b_id * self.bucket_size
+            self.buckets[b_id] = {
+                'start': s_blk,
+                'end': min(s_blk + self.bucket_size - 1, self.end_block),
+                'sampled': 0,
+                'hits': 0,
+                'files': 0,
+                'payloads': 0,
+                'payload_bytes': 0,
+                'max_block_bytes': 0
+            }
+
+        return self.buckets[b_id]
+
+
+    # ratio of sampled blocks with files found on them
+    @staticmethod
+    def hit_rate(bucket):
+        return bucket['hits'] / bucket['sampled']
+
+
+    # average size of payloads seen on bucket
+    @staticmethod
+    def avg_payload_size(bucket):
+        return bucket['payload_bytes'] / bucket['payloads'] if bucket['payloads'] else 0.0
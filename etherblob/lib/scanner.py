@@ -0,0 +1,112 @@
+import asyncio
+import queue
+import threading
+from etherblob.lib.explorer import EtherBlobExplorer
+
+class Scanner():
+    QUEUE_SIZE = 64         # max findings waiting for the consumer before the scan blocks
+    PUT_TIMEOUT = 0.5       # secs between checks for a stopped consumer while queue is full
+    DONE = object()         # end of scan marker
+
+    # embeddable scanner, iterate over it (either sync or async) to get findings as they are found
+    def __init__(self, config, queue_size = QUEUE_SIZE):
+        self.config = config
+        self.queue = queue.Queue(maxsize = queue_size)
+        self.stop_event = threading.Event()
+        self.explorer = None
+        self.thread = None
+
+
+    # iterate over findings, blocking until next one is found
+    def __iter__(self):
+        self.start()
+        try:
+            while (item := self.get()) is not self.DONE:
+                yield item
+        finally:
+            self.close()
+
+
+    # iterate asynchronously over findings
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+
+        self.start()
+        try:
+            while (item := self.get(await loop.run_in_executor(None, self.queue.get))) is not self.DONE:
+                yield item
+        finally:
+            self.close()
+
+
+    # start scan on its own thread (only once)
+    def start(self):
+        if not self.thread:
+            self.thread = threading.Thread(target = self.run, daemon = True)
+            self.thread.start()
+
+        return
+
+
+    # stop scan after current block, dropping findings not yet consumed
+    def close(self):
+        self.stop_event.set()
+        if self.explorer:
+            self.explorer.stop()
+
+        # scan won't put anything else, so wake up any getter still waiting on queue (e.g. the
+        # executor thread of a cancelled async consumer)
+        while True:
+            try:
+                while True:
+                    self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(self.DONE)
+                break
+            except queue.Full:
+                continue
+
+        return
+
+
+    # scanning thread, runs engine and feeds findings into queue
+    def run(self):
+        try:
+            self.explorer = EtherBlobExplorer(self.config)
+            self.explorer.output.listeners.append(self.put)
+
+            # consumer may have left while explorer was being set up
+            if self.stop_event.is_set():
+                self.explorer.stop()
+            self.explorer.run_engine()
+        except BaseException as e:
+            # raise error on consumer's side
+            self.put(e)
+        finally:
+            self.put(self.DONE)
+
+        return
+
+
+    # put item on queue, blocking scan while it's full unless consumer is gone
+    def put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout = self.PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+        return
+
+
+    # get next item from queue (or process already taken one), raising errors coming from scan
+    def get(self, item = None):
+        if item is None:
+            item = self.queue.get()
+        if isinstance(item, BaseException):
+            raise item
+
+        return item
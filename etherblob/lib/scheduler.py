@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from etherblob.utils.errors import FatalError
+
+class Scheduler():
+    LARGE_SIZE = 2**16          # payloads from this size on go to dedicated workers
+    BATCH_SIZE = 64             # max small payloads analyzed on one task
+    BATCH_BYTES = 2**18         # max bytes of small payloads analyzed on one task
+
+    # size-aware scheduler of payload analysis: large payloads go one by one to dedicated workers
+    # while small ones are batched for the rest, admitting payloads only while the bytes in flight
+    # stay under budget (an oversized payload is admitted alone)
+    def __init__(self, blob_exp):
+        self.logger = blob_exp.logger
+        self.max_bytes = blob_exp.args.max_inflight_mb * 2**20
+
+        # split workers between large and small payloads (at least one each)
+        workers = blob_exp.args.workers or os.cpu_count()
+        large_workers = max(1, workers // 4)
+        self.large_pool = ThreadPoolExecutor(large_workers, thread_name_prefix = "etherblob-large")
+        self.small_pool = ThreadPoolExecutor(max(1, workers - large_workers), thread_name_prefix = "etherblob-small")
+
+        # small payloads waiting to be sent as a batch, bytes and tasks in flight and first error
+        # found by a worker, all guarded by condition (payloads can be submitted from many threads)
+        self.batch = []
+        self.batch_bytes = 0
+        self.cond = threading.Condition(threading.RLock())
+        self.inflight_bytes = 0
+        self.tasks_c = 0
+        self.error = None
+
+        # tasks sent to pools and not done yet (cancelled by hand on close, as python 3.8 pools can't)
+        self.futures = set()
+
+
+    # schedule analysis of payload as 'func(data, *args)', blocking while over in-flight budget
+    def submit(self, func, data, *args):
+        size = len(data)
+        self.admit(size)
+
+        if size >= self.LARGE_SIZE:
+            self.dispatch(self.large_pool, [(func, data, args)], size)
+        else:
+            with self.cond:
+                self.batch.append((func, data, args))
+                self.batch_bytes += size
+                if len(self.batch) >= self.BATCH_SIZE or self.batch_bytes >= self.BATCH_BYTES:
+                    self.flush()
+
+        return
+
+
+    # send pending small payloads as one task
+    def flush(self):
+        with self.cond:
+            if self.batch:
+                self.dispatch(self.small_pool, self.batch, self.batch_bytes)
+                self.batch, self.batch_bytes = [], 0
+
+        return
+
+
+    # wait until every scheduled payload is analyzed, raising first error found by workers
+    def join(self):
+        self.flush()
+        with self.cond:
+            self.cond.wait_for(lambda: not self.tasks_c)
+            self.raise_error()
+
+        return
+
+
+    # stop workers, dropping payloads not analyzed yet
+    def close(self):
+        with self.cond:
+            self.batch, self.batch_bytes = [], 0
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+        self.large_pool.shutdown()
+        self.small_pool.shutdown()
+
+        return
+
+
+    # wait for enough bytes in flight to be released (sending pending batch first, as it holds bytes too)
+    def admit(self, size):
+        with self.cond:
+            self.raise_error()
+            if self.inflight_bytes + size <= self.max_bytes:
+                self.inflight_bytes += size
+                return
+
+        self.flush()
+        with self.cond:
+            self.cond.wait_for(lambda: self.error or not self.inflight_bytes
+                                or self.inflight_bytes + size <= self.max_bytes)
+            self.raise_error()
+            self.inflight_bytes += size
+
+        return
+
+
+    # send task to pool, accounting it as in flight
+    def dispatch(self, pool, payloads, size):
+        with self.cond:
+            self.tasks_c += 1
+
+        future = pool.submit(self.run, payloads, size)
+        with self.cond:
+            self.futures.add(future)
+        future.add_done_callback(self.discard)
+
+        return
+
+
+    # worker side: analyze every payload of task and release its bytes
+    def run(self, payloads, size):
+        try:
+            for func, data, args in payloads:
+                func(data, *args)
+        except Exception as e:
+            with self.cond:
+                self.error = self.error or e
+        finally:
+            with self.cond:
+                self.inflight_bytes -= size
+                self.tasks_c -= 1
+                self.cond.notify_all()
+
+        return
+
+
+    # forget task once done (or cancelled)
+    def discard(self, future):
+        with self.cond:
+            self.futures.discard(future)
+
+        return
+
+
+    # raise first error found by workers on scheduling thread (condition must be held)
+    def raise_error(self):
+        if self.error:
+            if isinstance(self.error, FatalError):
+                raise self.error
+            raise FatalError(f"Unexpected error found analyzing payloads: {self.error}")
+
+        return
@@ -1,8 +1,11 @@
+import threading
+from collections import Counter
 from time import time
-from math import log
+from math import log, log2
 
 class Stats():
     WAIT_TIME = 60      # time to wait until showing metrics
+    clogc_tables = {}   # c*log2(c) tables for sliding-window entropy, by window size
 
     def __init__(self, blob_exp):
         self.logger = blob_exp.logger
@@ -14,36 +17,88 @@ class Stats():
         self.last_blk_n = 0
 
         # counters for interesting stats
+        self.blocks_c = 0
         self.files_c = 0
         self.trans_c = 0
         self.addr_file_c = 0
+        self.logs_c = 0
+
+        # analyzed payloads and their total size
+        self.payloads_c = 0
+        self.payload_bytes = 0
+
+        # counters are updated from every job's fetch thread and analysis workers
+        self.lock = threading.Lock()
 
         # message to show every 60s
-        self.cycle_msg = f"Parsed {{}}/{self.total_blocks} blocks ({{}} [block]/[min]), "
+        self.cycle_msg = "Parsed {}/{} blocks ({} [block]/[min]), "
         self.cycle_msg += "found {} files so far"
 
 
+    # count processed blocks
+    def count_block(self, blocks_c = 1):
+        with self.lock:
+            self.blocks_c += blocks_c
+
+        return
+
+
+    # count more blocks to process (e.g. chain head moved while following it)
+    def grow_total(self, blocks_c):
+        with self.lock:
+            self.total_blocks += blocks_c
+
+        return
+
+
+    # count processed transaction
+    def count_transaction(self):
+        with self.lock:
+            self.trans_c += 1
+
+        return
+
+
+    # count processed event logs
+    def count_logs(self, logs_c):
+        with self.lock:
+            self.logs_c += logs_c
+
+        return
+
+
+    # count payload being analyzed
+    def count_payload(self, size):
+        with self.lock:
+            self.payloads_c += 1
+            self.payload_bytes += size
+
+        return
+
+
     # show overall progress metrics since a certain time
     def show_cycle_metrics(self):
-        if (time() - self.last_time) >= self.WAIT_TIME:
-            # format template message with dynamic block data
-            curr_blk = self.blob_exp.block_id - self.blob_exp.args.start_block
-            msg = self.cycle_msg.format(curr_blk, curr_blk - self.last_blk_n,
-                                        self.files_c)
-
-            # append data to cycle message with correct args according to extraction mode
-            if self.blob_exp.args.transactions:
-                msg += f" and {self.trans_c} transactions"
-            if self.blob_exp.args.addresses:
-                msg += f" {self.trans_c} transactions, and "\
-                        f"{len(self.blob_exp.extractor.tracked_addr)} interesting addresses"
-            msg += "..."
-
-            self.logger.info(msg)
-
-            # record new milestones
-            self.last_time = time()
-            self.last_blk_n = curr_blk
+        # only one job shows them per cycle
+        with self.lock:
+            if (time() - self.last_time) >= self.WAIT_TIME:
+                # format template message with dynamic block data
+                curr_blk = self.blocks_c
+                msg = self.cycle_msg.format(curr_blk, self.total_blocks, curr_blk - self.last_blk_n,
+                                            self.files_c)
+
+                # append data to cycle message with correct args according to extraction mode
+                if self.blob_exp.args.transactions:
+                    msg += f" and {self.trans_c} transactions"
+                if self.blob_exp.args.addresses:
+                    msg += f" {self.trans_c} transactions, and "\
+                            f"{self.blob_exp.count_tracked_addr()} interesting addresses"
+                msg += "..."
+
+                self.logger.info(msg)
+
+                # record new milestones
+                self.last_time = time()
+                self.last_blk_n = curr_blk
 
         return
 
@@ -51,34 +106,94 @@ class Stats():
     def show_final_metrics(self):
         self.logger.info(f"Finished exploring all {self.total_blocks} blocks!")
         self.logger.info(f"Total of extracted files: {self.files_c}")
+        self.logger.info(f"Total of analyzed payloads: {self.payloads_c} ({self.payload_bytes} bytes)")
 
         # show extra info if these extraction modes were enabled
         if self.blob_exp.args.transactions or self.blob_exp.args.addresses:
             self.logger.info(f"Total of transactions: {self.trans_c}")
+        if self.blob_exp.args.logs:
+            self.logger.info(f"Total of event logs: {self.logs_c}")
         if self.blob_exp.args.addresses:
             self.logger.info(f"Total of interesting addresses: "\
-                            f"{len(self.blob_exp.extractor.tracked_addr)}")
+                            f"{self.blob_exp.count_tracked_addr()}")
             self.logger.info(f"Total of files found on interesting addresses: {self.addr_file_c}")
 
         return
 
 
-    # calculate shannon entropy for files as byte arrays
+    # calculate shannon entropy for files as byte arrays, counting bytes in C (Counter) and using
+    # H = log2(n) - sum(c*log2(c)) / n over the (at most 256) counts
     @classmethod
     def entropy(cls, byte_arr):
-        ent = 0.0
-        freq = {}
+        if not (size := len(byte_arr)):
+            return 0.0
+
+        clogc = sum(c * log2(c) for c in Counter(byte_arr).values())
+
+        return max(0.0, log2(size) - clogc / size)
+
+
+    # find contiguous regions of data whose entropy (over a sliding window) is between limits, as
+    # (start, end) offsets, updating byte counts and sum of c*log2(c) incrementally on every slide
+    @classmethod
+    def entropy_regions(cls, byte_arr, window, ent_min, ent_max):
         size = len(byte_arr)
 
-        # get frequency for every byte
-        for byte in byte_arr:
-            if not freq.get(byte):
-                freq[byte] = 0
-            freq[byte] += 1
+        # data fitting in one window is measured as a whole
+        if size <= window:
+            return [(0, size)] if size and ent_min <= cls.entropy(byte_arr) <= ent_max else []
+
+        # window entropy is log2(W) - sum(c*log2(c)) / W, so limits are turned into limits for that sum
+        clogc = cls.get_clogc_table(window)
+        sum_max = (log(window, 2) - ent_min) * window
+        sum_min = (log(window, 2) - ent_max) * window
+        eps = 1e-9 * window
+
+        counts = [0] * 256
+        for byte in byte_arr[:window]:
+            counts[byte] += 1
+        clogc_sum = sum(clogc[c] for c in counts)
+
+        regions = []
+        region_s = None
+        for i in range(size - window + 1):
+            # slide window one byte (first one is already counted)
+            if i:
+                old, new = byte_arr[i - 1], byte_arr[i + window - 1]
+                if old != new:
+                    clogc_sum += clogc[counts[old] - 1] - clogc[counts[old]]
+                    counts[old] -= 1
+                    clogc_sum += clogc[counts[new] + 1] - clogc[counts[new]]
+                    counts[new] += 1
+
+            in_limits = sum_min - eps <= clogc_sum <= sum_max + eps
+            if in_limits and region_s is None:
+                region_s = i
+            elif not in_limits and region_s is not None:
+                cls.add_region(regions, region_s, i - 1 + window)
+                region_s = None
+
+        if region_s is not None:
+            cls.add_region(regions, region_s, size)
+
+        return regions
+
+
+    # add region merging it with last one if they overlap
+    @staticmethod
+    def add_region(regions, start, end):
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
 
-        # calculate entropy
-        for f in freq.values():
-            f = f / size
-            ent += f * log(f, 2)
+        return
+
+
+    # get (cached) table of c*log2(c) for every count a window can have
+    @classmethod
+    def get_clogc_table(cls, window):
+        if window not in cls.clogc_tables:
+            cls.clogc_tables[window] = [0.0] + [c * log(c, 2) for c in range(1, window + 1)]
 
-        return -1 * ent
+        return cls.clogc_tables[window]
@@ -0,0 +1,111 @@
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+class TimestampIndex():
+    TS_INDEX = ".ts-index_{}"       # default index file name (one per network)
+    TYPECODE = 'Q'                  # unsigned 64-bit ints for both block ids and timestamps
+
+    def __init__(self, idx_path, net):
+        self.idx_path = self.get_index_path(idx_path, net)
+
+        # sorted (by block id and thus by timestamp) parallel arrays of known blocks
+        self.blocks = array(self.TYPECODE)
+        self.times = array(self.TYPECODE)
+        self.dirty = False
+
+        # jobs on same network share index from their own threads
+        self.lock = threading.RLock()
+
+        self.load()
+
+
+    # load previously cached index from disk (if any)
+    def load(self):
+        if not os.path.exists(self.idx_path):
+            return
+
+        pairs = array(self.TYPECODE)
+        with open(self.idx_path, "rb") as idx_file:
+            pairs.frombytes(idx_file.read())
+
+        # file is laid out as every block id followed by every timestamp
+        half = len(pairs) // 2
+        self.blocks, self.times = pairs[:half], pairs[half:2 * half]
+
+        return
+
+
+    # save index into disk if it changed since last load/save
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+
+            # write to tmp file and then replace, so a killed run can't corrupt the cache
+            tmp_path = f"{self.idx_path}.tmp"
+            with open(tmp_path, "wb") as idx_file:
+                self.blocks.tofile(idx_file)
+                self.times.tofile(idx_file)
+            os.replace(tmp_path, self.idx_path)
+
+            self.dirty = False
+
+        return
+
+
+    # record an already fetched block's timestamp
+    def add(self, blk_id, timestamp):
+        with self.lock:
+            i = bisect_left(self.blocks, blk_id)
+
+            # already known block
+            if i < len(self.blocks) and self.blocks[i] == blk_id:
+                return
+
+            self.blocks.insert(i, blk_id)
+            self.times.insert(i, timestamp)
+            self.dirty = True
+
+        return
+
+
+    # resolve timestamp to block id, returns None if the index can't give an exact answer
+    def lookup(self, timestamp, closest):
+        with self.lock:
+            return self.lookup_unlocked(timestamp, closest)
+
+
+    # resolve timestamp to block id (lock must be held)
+    def lookup_unlocked(self, timestamp, closest):
+        if closest == 'before':
+            # last known block commited at or before timestamp
+            i = bisect_right(self.times, timestamp) - 1
+            if i < 0:
+                return None
+
+            # exact if block matches timestamp or its very next block is already after it
+            if self.times[i] == timestamp or \
+            (i + 1 < len(self.blocks) and self.blocks[i + 1] == self.blocks[i] + 1):
+                return self.blocks[i]
+        else:
+            # first known block commited at or after timestamp
+            i = bisect_left(self.times, timestamp)
+            if i == len(self.times):
+                return None
+
+            # exact if block matches timestamp or its previous block is still before it
+            if self.times[i] == timestamp or \
+            (i > 0 and self.blocks[i - 1] == self.blocks[i] - 1):
+                return self.blocks[i]
+
+        return None
+
+
+    # get index file name
+    def get_index_path(self, idx_path, net):
+        if idx_path == "default_ts_index":
+            idx_path = self.TS_INDEX.format(net)
+
+        return os.path.abspath(idx_path)
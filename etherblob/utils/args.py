@@ -1,5 +1,8 @@
 import argparse
+import sys
 import etherblob
+from etherblob.utils.config import Config
+from etherblob.utils.errors import ConfigError
 
 class Args():
     # get args and parse them
@@ -11,6 +14,15 @@ class Args():
         return args
 
 
+    # get args for reanalysis of a recorded corpus and parse them
+    @classmethod
+    def get_reanalyze_args(cls):
+        args = cls.setup_reanalyze_argparser()
+        args = cls.validate_args(args)
+
+        return args
+
+
     # print message and exit
     @staticmethod
     def print_exit(msg):
@@ -23,50 +35,16 @@ class Args():
     # validate args according to certain logic (on error, should make program end on the spot)
     @classmethod
     def validate_args(cls, args):
-        # enable transaction search mode as default only if other modes are not enabled
-        if not args.blocks and not args.addresses and not args.contracts:
-            args.transactions = True
-
-        # enable file header search as default only if other locations are not enabled
-        if not args.embedded and not args.unicode and not args.encrypted \
-        and not args.strings and args.custom_entropy == [-1, -1]:
-            args.file_header = True
-
-        # assure ending range ID bigger than starting one
-        if args.end_block < args.start_block:
-            cls.print_exit("Invalid args: ending block ID/timetamp should be bigger than starting one!")
-
-        # assure transaction saving is only enabled if extraction from transactions mode is enabled too
-        if (args.transactions == False) and args.save_transactions:
-            cls.print_exit("Can't save transactions without transaction extracting mode!")
-
-        # assure entropy custom limits are between 0 and 8, and they make sense
-        if (ent := args.custom_entropy) != [-1, -1]:
-            valid = True
-            if ent[0] > ent[1]:
-                valid = False
-            elif ent[0] < 0 or ent[0] > 8:
-                valid = False
-            elif ent[1] < 0 or ent[1] > 8:
-                valid = False
-
-            if not valid:
-                cls.print_exit("Entropy limits should be between 0.0 and 8.0 and with first < second!")
-
-        # assure custom entropy limits and encrypted/unicode flag are not set at same time
-        if ((args.encrypted or args.unicode) and args.custom_entropy != [-1, -1]) \
-        or (args.encrypted and args.unicode):
-            cls.print_exit("Custom entropies/encrypted/unicode flag should be used separately!")
-
-        # assure sane storage array indexes and check that it's only selected when '--contracts' is enabled
-        if (cont_pos := args.contract_position) != -1:
-            if not args.contracts:
-                cls.print_exit("Invalid args: '--contract-position' should be enabled only when "\
-                            "'--contracts' is enabled too!")
-            elif cont_pos <= 0:
-                cls.print_exit("Contract position should be positive!")
+        # CLI shows banner and logs on terminal, unless findings are going to stdout as json lines
+        args.banner = not args.jsonl
+        args.console = "stderr" if args.jsonl else "stdout"
 
-        return args
+        try:
+            config = Config.from_args(args)
+        except ConfigError as e:
+            cls.print_exit(str(e))
+
+        return config
 
 
     # setup arg parser object
@@ -102,13 +80,204 @@ class Args():
                 blob files on contract\'s storage. If enabled then transaction input \
                 check is disabled unless explicitly enabled.')
 
+        # enable search on event logs
+        parser.add_argument('--logs', action = 'store_true', help = 'Search for \
+                blob files on data of event logs emitted by contracts, fetched for many blocks \
+                per query. If enabled then transaction input check is disabled unless \
+                explicitly enabled.')
+
         # choose blockchain net
         parser.add_argument('--network', '-N', type = str.lower, help = 'Choose blockchain \
                 network to search in. Available choices are Main, Goerli (Görli), Kovan, \
                 Rinkeby and Ropsten. MainNet is the default network. Case-insensitive.',
-                choices = ['main', 'goerli', 'kovan', 'rinkeby', 'ropsten'],
-                default = 'main')
+                choices = Config.NETWORKS, default = 'main')
+
+        # other networks and ranges
+        parser.add_argument('-J', '--job', dest = 'jobs', type = cls.parse_job, action = 'append', help = 'Also \
+                scan given block range on given network (as \'NETWORK:START:END[:RATE]\') along the main one, \
+                on the same run. Every job fetches its blocks on its own (with its own API connections and \
+                rate limit, \'--rate-limit\' unless given) while sharing analysis workers and output. Can be \
+                given many times.', default = [])
+
+        # search and extraction methods
+        cls.add_method_args(parser)
+
+        # search until the (N-1)th position at contract's storage array
+        parser.add_argument('-C', '--contract-position', type = int, help = 'Search inside contract\'s data \
+                until reaching the (N-1)th position on its storage array. Positions contain 32 \
+                bytes worth of data. Count starts at 0 and default pos is the 15th pos \
+                (16 indexes in total) if no custom position is given.', default = -1)
+
+        # interpret start and end block ids as timestamps
+        parser.add_argument('-t', '--timestamps', action = 'store_true', help = 'If enabled, then start and \
+                end block IDs are interpreted as UNIX timestamps that are then resolved to the closest \
+                commited blocks for those specific times.')
+
+        # keep following chain head after ending block
+        parser.add_argument('-F', '--follow', action = 'store_true', help = 'If enabled, keep running \
+                after reaching the ending block, processing every new block as soon as it gets \
+                commited (re-checking the last blocks on chain reorgs) until interrupted.')
+
+        # scan transaction history of addresses
+        parser.add_argument('--history', type = str, nargs = '+', metavar = 'ADDRESS', help = 'Only \
+                search transactions sent from/to given addresses on the range, fetching their \
+                transaction history (paged and with addresses queried concurrently) instead of \
+                walking every block. Fetched transactions are cached on disk, so later scans only \
+                query blocks not seen yet.', default = [])
+
+        # address history cache path
+        parser.add_argument('--history-cache', type = str, help = 'Path to dir caching transaction \
+                history of addresses given with \'--history\'. Default is \'.history_{network}\'.',
+                default = "default_history_cache")
+
+        # survey range sampling blocks
+        parser.add_argument('--sample', type = int, help = 'If given, only process N random blocks on \
+                every bucket of the range (stratified sampling) and report each bucket\'s hit rate and \
+                payload sizes, as a cheap survey of where interesting data is before a full scan.',
+                default = 0)
+
+        # sampling bucket size
+        parser.add_argument('--bucket-size', type = int, help = 'Size (in blocks) of buckets used \
+                by \'--sample\'. Default is 10000.', default = 10000)
+
+        # sampling seed
+        parser.add_argument('--seed', type = int, help = 'Seed for \'--sample\', so the same blocks \
+                are picked again on later runs. Random by default.', default = None)
+
+        # timestamp index path
+        parser.add_argument('-T', '--ts-index', type = str, help = 'Path to local index of already \
+                seen block timestamps, used to resolve \'--timestamps\' without querying the API. \
+                Default is \'.ts-index_{network}\'.', default = "default_ts_index")
+
+        # api key path
+        parser.add_argument('-K', '--api-key-path', type = str, help = 'Path to file with Etherscan \
+                API key for queries. Default search location is \'.api-key\'.', default = ".api-key")
+
+        # api key
+        parser.add_argument('-k', '--api-key', type = str, help = 'Etherscan API key as parameter. \
+                If given then \'--api-key-path\' is ignored.', default = 'default_api_key')
+
+        # concurrent api requests
+        parser.add_argument('-c', '--concurrency', type = int, help = 'Max concurrent API requests \
+                (and kept-alive connections). Default is 4.', default = 4)
+
+        # api timeouts
+        parser.add_argument('--timeouts', type = float, help = 'Connect and read timeouts (in secs) \
+                for API requests. Default is 5 and 30.', nargs = 2, default = [5.0, 30.0])
+
+        # api rate limit
+        parser.add_argument('-r', '--rate-limit', type = float, help = 'Max API requests per second \
+                sent by every job (each one is limited on its own, so jobs sharing an API key should \
+                split its limit). 0 for unlimited. Default is 5 (free API key limit).', default = 5.0)
+
+        # number of analysis threads
+        parser.add_argument('-w', '--workers', type = int, help = 'Number of threads analyzing payloads \
+                (a quarter of them only for large payloads). Default is the number of CPUs.', default = None)
+
+        # in-flight payloads budget
+        parser.add_argument('--max-inflight-mb', type = int, help = 'Max size (in MB) of payloads fetched \
+                but not analyzed yet, fetching waits while over it. Default is 256.', default = 256)
+
+        # extracted files' output directory
+        parser.add_argument('-D', '--output-dir', type = str, help = 'Out-dir for extracted files. \
+                Default is \'ext_{start block}-{end block}\'.', default = "default_ext_dir")
+
+        # archive extracted files
+        parser.add_argument('-A', '--archive', dest = 'archive_size', type = int, help = 'If given, extracted \
+                files are written into tar archives inside out-dir (starting a new one every N MB), with an \
+                index of where every file is (\'archive.sqlite\'), instead of one file each.', default = 0)
+
+        # compress archives
+        parser.add_argument('--zstd', action = 'store_true', help = 'If enabled, archives are compressed with \
+                zstd (each file on a frame of its own, so they can still be read one by one). Needs the \
+                \'zstandard\' package.')
+
+        # output log file
+        parser.add_argument('-o', '--out-log', type = str, help = 'Out-file for logs. Default is \
+                \'etherblob_{start block}-{end block}.log\'.', default = "default_log_file")
+
+        # log level
+        parser.add_argument('-l', '--log-level', type = str.lower, help = 'Minimum level of logged \
+                messages. Default is \'info\'.', choices = ['debug', 'info', 'warning', 'error'],
+                default = 'info')
+
+        # save all transactions and their info
+        parser.add_argument('-s', '--save-transactions', action = 'store_true', help = 'If enabled, all \
+                transactions and their info are stored at file \
+                \'transactions_{start-block}-{end-block}.txt\'')
+
+        # ignored file formats
+        cls.add_ignored_fmt_arg(parser)
+
+        # record payloads for later reanalysis
+        parser.add_argument('--corpus', type = str, help = 'If given, every non-trivial payload seen \
+                (inputs, block and contract data, address data) is appended to this packed file (with \
+                an offset index next to it, recording its network too) for later reanalysis via \
+                \'etherblob reanalyze\'.')
+
+        # output findings as json lines
+        parser.add_argument('--jsonl', action = 'store_true', help = 'If enabled, every finding is \
+                printed to stdout as a JSON line as soon as it is found, while logs go to stderr.')
+
+        # print version and exit
+        parser.add_argument('--version', action = 'version', version = f'EtherBlob Explorer {etherblob.__version__}')
+
+        return parser.parse_args()
 
+
+    # setup arg parser object for reanalysis subcommand
+    @classmethod
+    def setup_reanalyze_argparser(cls):
+        parser = argparse.ArgumentParser(prog = 'etherblob reanalyze', description = 'Search and \
+                extract blob files again on a corpus recorded via \'--corpus\', without any network.')
+
+        # corpus path
+        parser.add_argument('corpus', type = str, help = 'Path to recorded corpus.')
+
+        # search and extraction methods
+        cls.add_method_args(parser)
+
+        # ignored file formats
+        cls.add_ignored_fmt_arg(parser)
+
+        # number of worker processes
+        parser.add_argument('-w', '--workers', type = int, help = 'Number of worker processes. \
+                Default is the number of CPUs.', default = None)
+
+        # extracted files' output directory
+        parser.add_argument('-D', '--output-dir', type = str, help = 'Out-dir for extracted files. \
+                Default is \'ext_reanalyze\'.', default = "ext_reanalyze")
+
+        # output log file
+        parser.add_argument('-o', '--out-log', type = str, help = 'Out-file for logs. Default is \
+                \'etherblob_reanalyze.log\'.', default = "etherblob_reanalyze.log")
+
+        # log level
+        parser.add_argument('-l', '--log-level', type = str.lower, help = 'Minimum level of logged \
+                messages. Default is \'info\'.', choices = ['debug', 'info', 'warning', 'error'],
+                default = 'info')
+
+        # there's no block range nor json lines output on reanalysis
+        parser.set_defaults(start_block = 0, end_block = 0, jsonl = False)
+
+        return parser.parse_args(sys.argv[2:])
+
+
+    # parse job as (network, start block, end block, rate limit or None)
+    @staticmethod
+    def parse_job(job):
+        try:
+            net, s_blk, e_blk, *rate = job.split(":")
+            if len(rate) > 1:
+                raise ValueError
+            return net.lower(), int(s_blk), int(e_blk), float(rate[0]) if rate else None
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid job '{job}', should be 'NETWORK:START:END[:RATE]'")
+
+
+    # add search and extraction method args to parser
+    @classmethod
+    def add_method_args(cls, parser):
         # enable file header search
         parser.add_argument('-H', '--file-header', action = 'store_true', help = 'If enabled,\
                 search for file formats via magic bytes/file headers on data \
@@ -138,52 +307,27 @@ class Args():
                 (blocks, transactions, addresses) using Shannon\'s Entropy (between 7.0 and 8.0) \
                 if no other discernible file is found first on that data.')
 
+        # entropy window
+        parser.add_argument('--entropy-window', type = int, help = 'Size (in bytes) of the window \
+                slid over data on entropy-based searches, so only regions with entropy between limits \
+                get extracted. Data smaller than it is measured as a whole. Default is 1024.', default = 1024)
+
         # search for strings
         parser.add_argument('-S', '--strings', action = 'store_true', help = 'If enabled, attempt to \
                 search and dump ASCII strings into files found inside harvested data \
                 (blocks, transactions, addresses) if no other discernible file is \
                 found first on that data.')
 
-        # search until the (N-1)th position at contract's storage array
-        parser.add_argument('-C', '--contract-position', type = int, help = 'Search inside contract\'s data \
-                until reaching the (N-1)th position on its storage array. Positions contain 32 \
-                bytes worth of data. Count starts at 0 and default pos is the 15th pos \
-                (16 indexes in total) if no custom position is given.', default = -1)
-
-        # interpret start and end block ids as timestamps
-        parser.add_argument('-t', '--timestamps', action = 'store_true', help = 'If enabled, then start and \
-                end block IDs are interpreted as UNIX timestamps that are then resolved to the closest \
-                commited blocks for those specific times.')
-
-        # api key path
-        parser.add_argument('-K', '--api-key-path', type = str, help = 'Path to file with Etherscan \
-                API key for queries. Default search location is \'.api-key\'.', default = ".api-key")
-
-        # api key
-        parser.add_argument('-k', '--api-key', type = str, help = 'Etherscan API key as parameter. \
-                If given then \'--api-key-path\' is ignored.', default = 'default_api_key')
-
-        # extracted files' output directory
-        parser.add_argument('-D', '--output-dir', type = str, help = 'Out-dir for extracted files. \
-                Default is \'ext_{start block}-{end block}\'.', default = "default_ext_dir")
-
-        # output log file
-        parser.add_argument('-o', '--out-log', type = str, help = 'Out-file for logs. Default is \
-                \'etherblob_{start block}-{end block}.log\'.', default = "default_log_file")
+        return
 
-        # save all transactions and their info
-        parser.add_argument('-s', '--save-transactions', action = 'store_true', help = 'If enabled, all \
-                transactions and their info are stored at file \
-                \'transactions_{start-block}-{end-block}.txt\'')
 
-        # ignored file formats
+    # add ignored file formats arg to parser
+    @classmethod
+    def add_ignored_fmt_arg(cls, parser):
         parser.add_argument('-i', '--ignored-fmt',  help = 'Ignored file formats for extraction. \
                 Default ignored/common file formats are \'ISO-8859 text\' and \'Non-ISO extended-ASCII \
                 text\'. The \'data\' file format is always ignored. Accepts file format substrings and \
                 makes case-insensitive matches. \'*\' is a wildcard to ignore all file formats.', \
                 nargs = '*', default = ["default_file_fmt"])
 
-        # print version and exit
-        parser.add_argument('--version', action = 'version', version = f'EtherBlob Explorer {etherblob.__version__}')
-
-        return parser.parse_args()
+        return
@@ -0,0 +1,181 @@
+import re
+from etherblob.utils.errors import ConfigError
+
+class Config():
+    NETWORKS = ('main', 'goerli', 'kovan', 'rinkeby', 'ropsten')
+
+    # every option with its default value (same ones as the CLI, except for the output related ones)
+    DEFAULTS = {
+        'transactions': False,
+        'blocks': False,
+        'addresses': False,
+        'contracts': False,
+        'logs': False,
+        'history': [],              # addresses whose transactions are fetched instead of walking every block
+        'history_cache': "default_history_cache",
+        'network': "main",
+        'jobs': [],                 # other (network, start block, end block[, rate limit]) jobs scanned along given range
+        'file_header': False,
+        'embedded': False,
+        'unicode': False,
+        'custom_entropy': [-1.0, -1.0],
+        'entropy_window': 1024,
+        'encrypted': False,
+        'strings': False,
+        'contract_position': -1,
+        'timestamps': False,
+        'follow': False,
+        'sample': 0,
+        'bucket_size': 10000,
+        'seed': None,
+        'ts_index': "default_ts_index",
+        'api_key_path': ".api-key",
+        'api_key': "default_api_key",
+        'concurrency': 4,
+        'timeouts': [5.0, 30.0],
+        'rate_limit': 5.0,          # max api requests per sec of every job (0 for unlimited)
+        'output_dir': "default_ext_dir",
+        'out_log': "default_log_file",
+        'archive_size': 0,          # size (in MB) of rotating archives for extracted files (0 for plain dirs)
+        'zstd': False,
+        'log_level': "info",
+        'save_transactions': False,
+        'corpus': None,
+        'workers': None,            # analysis threads (worker processes for reanalysis), defaults to CPU count
+        'max_inflight_mb': 256,
+        'ignored_fmt': ["default_file_fmt"],
+        'jsonl': False,
+        'banner': False,           # print ascii banner
+        'console': None            # stream for console logs ('stdout', 'stderr' or None to disable them)
+    }
+
+    # scan configuration for a block range, options are the ones on 'DEFAULTS'
+    def __init__(self, start_block, end_block, **options):
+        for opt in options:
+            if opt not in self.DEFAULTS:
+                raise ConfigError(f"Unknown option '{opt}'!")
+
+        self.start_block = start_block
+        self.end_block = end_block
+        for opt, default in self.DEFAULTS.items():
+            setattr(self, opt, options.get(opt, default))
+
+        self.validate()
+
+
+    # build config from parsed CLI args
+    @classmethod
+    def from_args(cls, args):
+        options = vars(args).copy()
+        start_block, end_block = options.pop('start_block'), options.pop('end_block')
+
+        return cls(start_block, end_block, **options)
+
+
+    # validate options according to certain logic, raising error on invalid ones
+    def validate(self):
+        # enable transaction search mode as default only if other modes are not enabled
+        if not self.blocks and not self.addresses and not self.contracts and not self.logs:
+            self.transactions = True
+
+        # enable file header search as default only if other locations are not enabled
+        if not self.embedded and not self.unicode and not self.encrypted \
+        and not self.strings and self.custom_entropy == [-1, -1]:
+            self.file_header = True
+
+        # assure ending range ID bigger than starting one
+        if self.end_block < self.start_block:
+            raise ConfigError("Invalid args: ending block ID/timetamp should be bigger than starting one!")
+
+        # assure transaction saving is only enabled if extraction from transactions mode is enabled too
+        if (self.transactions == False) and self.save_transactions:
+            raise ConfigError("Can't save transactions without transaction extracting mode!")
+
+        # assure entropy custom limits are between 0 and 8, and they make sense
+        if (ent := self.custom_entropy) != [-1, -1]:
+            valid = True
+            if ent[0] > ent[1]:
+                valid = False
+            elif ent[0] < 0 or ent[0] > 8:
+                valid = False
+            elif ent[1] < 0 or ent[1] > 8:
+                valid = False
+
+            if not valid:
+                raise ConfigError("Entropy limits should be between 0.0 and 8.0 and with first < second!")
+
+        # assure sane entropy window
+        if self.entropy_window <= 0:
+            raise ConfigError("Entropy window should be positive!")
+
+        # assure custom entropy limits and encrypted/unicode flag are not set at same time
+        if ((self.encrypted or self.unicode) and self.custom_entropy != [-1, -1]) \
+        or (self.encrypted and self.unicode):
+            raise ConfigError("Custom entropies/encrypted/unicode flag should be used separately!")
+
+        # assure sane storage array indexes and check that it's only selected when '--contracts' is enabled
+        if (cont_pos := self.contract_position) != -1:
+            if not self.contracts:
+                raise ConfigError("Invalid args: '--contract-position' should be enabled only when "\
+                            "'--contracts' is enabled too!")
+            elif cont_pos <= 0:
+                raise ConfigError("Contract position should be positive!")
+
+        # assure history addresses are valid (and compared in lowercase, as the api gives them)
+        for addr in self.history:
+            if not re.fullmatch(r"0x[0-9a-fA-F]{40}", addr):
+                raise ConfigError(f"Invalid address '{addr}' on history!")
+        self.history = list(dict.fromkeys(addr.lower() for addr in self.history))
+
+        # assure sane extra jobs
+        # (without their own rate limit they get the main one)
+        self.jobs = [tuple(job) if len(job) == 4 else (*job, None) for job in self.jobs]
+        self.jobs = [(net, s_blk, e_blk, self.rate_limit if rate is None else rate)
+                        for net, s_blk, e_blk, rate in self.jobs]
+        for net, s_blk, e_blk, rate in self.jobs:
+            if net not in self.NETWORKS:
+                raise ConfigError(f"Unknown network '{net}' on job!")
+            if e_blk < s_blk:
+                raise ConfigError(f"Invalid job on '{net}': ending block ID/timestamp should be bigger than starting one!")
+            if rate < 0:
+                raise ConfigError(f"Invalid job on '{net}': rate limit can't be negative!")
+
+        # assure sane sampling settings, only over a fixed range
+        if self.sample < 0:
+            raise ConfigError("Sampled blocks per bucket can't be negative!")
+        if self.bucket_size <= 0:
+            raise ConfigError("Bucket size should be positive!")
+        if self.sample and self.follow:
+            raise ConfigError("Invalid args: '--sample' can't be used along '--follow'!")
+        if self.logs and (self.follow or self.sample):
+            raise ConfigError("Invalid args: '--logs' can't be used along '--follow' nor '--sample'!")
+        if self.history and (self.blocks or self.follow or self.sample):
+            raise ConfigError("Invalid args: '--history' can't be used along '--blocks', '--follow' nor '--sample'!")
+        if self.sample and self.jobs:
+            raise ConfigError("Invalid args: '--sample' can't be used along '--job'!")
+
+        # assure sane archive size, and compression only for archives
+        if self.archive_size < 0:
+            raise ConfigError("Archive size can't be negative!")
+        if self.zstd and not self.archive_size:
+            raise ConfigError("Invalid args: '--zstd' should be enabled only along '--archive'!")
+
+        # assure sane analysis workers and in-flight payloads budget
+        if self.workers is not None and self.workers <= 0:
+            raise ConfigError("Workers should be positive!")
+        if self.max_inflight_mb <= 0:
+            raise ConfigError("Max in-flight payloads size should be positive!")
+
+        # assure sane api client settings
+        if self.concurrency <= 0:
+            raise ConfigError("Concurrency should be positive!")
+        if min(self.timeouts) <= 0:
+            raise ConfigError("Timeouts should be positive!")
+        if self.rate_limit < 0:
+            raise ConfigError("Rate limit can't be negative!")
+
+        # assure sane console stream
+        if self.console not in ("stdout", "stderr", None):
+            raise ConfigError("Console logs can only go to 'stdout', 'stderr' or be disabled!")
+
+        return
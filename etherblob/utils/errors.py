@@ -0,0 +1,18 @@
+# base error for everything that stops a scan
+class EtherBlobError(Exception):
+    pass
+
+
+# already handled (and logged) error that must stop the scan right away, never retried
+class FatalError(EtherBlobError):
+    pass
+
+
+# error on given scan options
+class ConfigError(EtherBlobError):
+    pass
+
+
+# error coming from the api (bad responses, rate limits, missing blocks, etc)
+class ApiError(EtherBlobError):
+    pass
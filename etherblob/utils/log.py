@@ -1,47 +1,91 @@
+import atexit
+import contextlib
+import itertools
 import logging
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from termcolor import colored
+from time import time
+from etherblob.utils.errors import FatalError
 
 class Logger():
     FILE_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
-    STDOUT_FORMAT = colored("%(asctime)s ", "yellow") + "%(message)s"
+    STDOUT_FORMAT = colored("%(asctime)s ", "yellow") + "%(prefix)s%(message)s"
     OUT_LOG = "etherblob_{}-{}.log"
     INFO = "{} ".format(colored("[INFO]", "blue"))
     WARNING = "{} ".format(colored("[WARN]", "red"))
     ERROR = "{} ".format(colored("[ERROR]", "white", "on_red", ['blink']))
     INFO_FILE = "{} ".format(colored("[INFO]", "blue", "on_cyan", ['bold']))
+    RATE_WINDOW = 10            # secs of every rate limiting window
+    RATE_MAX = 5                # max messages of the same class logged per window
+    IDS = itertools.count()     # unique ids for each logger instance
 
 
-    def __init__(self, args):
+    # logs are queued and written from a background thread, unless not queued (for pool processes,
+    # where exit handlers don't run and queued logs would be lost)
+    def __init__(self, args, queued = True):
         self.out_log = self.get_outlog(args.start_block, args.end_block, args.out_log)
-        self.cons_logger, self.file_logger = self.logging_setup()
+        self.console = args.console
+        self.level = logging.getLevelName(args.log_level.upper())
+        self.handlers = self.create_handlers()
+        self.logger, self.listener = self.logging_setup(queued)
 
+        # last error logged (reported when exiting)
+        self.last_error = None
 
-    # setup logging config for stdout and a file
-    def logging_setup(self):
-        # set formatter and create 2 loggers
-        stdout_fmt = logging.Formatter(self.STDOUT_FORMAT)
-        file_fmt = logging.Formatter(self.FILE_FORMAT)
-        file_log = logging.getLogger("file_handler")
-        cons_log = logging.getLogger("cons_handler")
+        # rate limited message classes: [window start, messages on window, suppressed messages]
+        # (guarded by lock, as many threads log)
+        self.rates = {}
+        self.rates_lock = threading.RLock()
 
-        # create file handler and attach to file logger
-        file_hdlr = logging.FileHandler(self.out_log)
-        file_hdlr.setFormatter(file_fmt)
-        file_hdlr.setLevel(logging.INFO)
-        file_log.addHandler(file_hdlr)
+        # make sure queued logs get written even if scan ends abruptly
+        if queued:
+            atexit.register(self.close)
 
-        # create console handler and attach to console logger
-        cons_hdlr = logging.StreamHandler(sys.stdout)
-        cons_hdlr.setFormatter(stdout_fmt)
-        cons_hdlr.setLevel(logging.INFO)
-        cons_log.addHandler(cons_hdlr)
 
-        # set logger levels
-        cons_log.setLevel(logging.INFO)
-        file_log.setLevel(logging.INFO)
+    # set formatters and create handlers (only for enabled outputs)
+    def create_handlers(self):
+        handlers = []
 
-        return cons_log, file_log
+        # create file handler (if log file is enabled)
+        if self.out_log:
+            file_hdlr = logging.FileHandler(self.out_log)
+            file_hdlr.setFormatter(logging.Formatter(self.FILE_FORMAT))
+            handlers.append(file_hdlr)
+
+        # create console handler (if console logs are enabled)
+        if self.console:
+            cons_hdlr = logging.StreamHandler(getattr(sys, self.console))
+            cons_hdlr.setFormatter(logging.Formatter(self.STDOUT_FORMAT))
+            handlers.append(cons_hdlr)
+
+        return handlers
+
+
+    # setup logging config for stdout and a file, written from a background thread if queued
+    def logging_setup(self, queued):
+        # logger of its own (not registered on logging's global manager, so it goes away along this
+        # instance), so different scans on same process don't mix their logs
+        logger = logging.Logger(f"etherblob.{next(self.IDS)}")
+        logger.setLevel(self.level)
+
+        # scanning thread only puts records on queue, listener formats and writes them
+        listener = None
+        if queued:
+            log_queue = SimpleQueue()
+            listener = QueueListener(log_queue, *self.handlers)
+            listener.start()
+            logger.addHandler(QueueHandler(log_queue))
+        else:
+            for handler in self.handlers:
+                logger.addHandler(handler)
+
+        # don't let records reach root logger of embedding apps
+        logger.propagate = False
+
+        return logger, listener
 
 
     # get log-file name
@@ -52,35 +96,106 @@ class Logger():
         return out_log
 
 
-    # wrapper around exit with logging message
+    # summarize suppressed messages, write every queued log and release handlers and logger (late
+    # messages are dropped)
+    def close(self):
+        if self.listener or self.handlers:
+            with self.rates_lock:
+                for key in list(self.rates):
+                    self.summarize(key)
+
+            if self.listener:
+                self.listener.stop()
+                self.listener = None
+            for handler in self.handlers:
+                handler.close()
+            self.handlers = []
+            self.logger.handlers = [logging.NullHandler()]
+
+            # don't keep closed instance alive until exit (embedding apps may run many scans)
+            atexit.unregister(self.close)
+
+        return
+
+
+    # check if message of a given class can be logged now, summarizing suppressed ones on new windows
+    def rate_limited(self, key):
+        now = time()
+
+        with self.rates_lock:
+            rate = self.rates.setdefault(key, [now, 0, 0])
+
+            if now - rate[0] >= self.RATE_WINDOW:
+                self.summarize(key)
+                rate = self.rates.setdefault(key, [now, 0, 0])
+
+            if rate[1] < self.RATE_MAX:
+                rate[1] += 1
+                return False
+
+            rate[2] += 1
+
+        return True
+
+
+    # log how many messages of a class were suppressed
+    def summarize(self, key):
+        with self.rates_lock:
+            _, _, suppressed = self.rates.pop(key, (None, None, 0))
+        if suppressed:
+            self.info(f"Suppressed {suppressed} more '{key}' messages in the last {self.RATE_WINDOW} [s]...")
+
+        return
+
+
+    # only log warnings and errors meanwhile (for startup messages another process already logged)
+    @contextlib.contextmanager
+    def quiet(self):
+        self.logger.setLevel(max(self.level, logging.WARNING))
+        try:
+            yield
+        finally:
+            self.logger.setLevel(self.level)
+
+        return
+
+
+    # stop the scan with logging message (CLI exits on it)
     def error_exit(self):
+        msg = self.last_error
         self.error("Exiting...")
-        exit(127)
+        self.close()
+        raise FatalError(msg)
+
+    # wrapper around 'logging' debug for Logger class
+    def debug(self, msg, key = None):
+        if self.logger.isEnabledFor(logging.DEBUG) and not (key and self.rate_limited(key)):
+            self.logger.debug(msg, extra = {'prefix': self.INFO})
+
+        return
 
-    # wrapper around 'logging' info for Logger class
-    def info(self, msg):
-        self.file_logger.info(msg)
-        self.cons_logger.info(self.INFO + msg)
+    # wrapper around 'logging' info for Logger class (optionally rate limited by message class)
+    def info(self, msg, key = None):
+        if self.logger.isEnabledFor(logging.INFO) and not (key and self.rate_limited(key)):
+            self.logger.info(msg, extra = {'prefix': self.INFO})
 
         return
 
     # wrapper around 'logging' info when files are found
     def info_file(self, msg):
-        self.file_logger.info(msg)
-        self.cons_logger.info(self.INFO_FILE + msg)
+        self.logger.info(msg, extra = {'prefix': self.INFO_FILE})
 
         return
 
     # wrapper around 'logging' warning for Logger class
     def warning(self, msg):
-        self.file_logger.warning(msg)
-        self.cons_logger.warning(self.WARNING + msg)
+        self.logger.warning(msg, extra = {'prefix': self.WARNING})
 
         return
 
     # wrapper around 'logging' error for Logger class
     def error(self, msg):
-        self.file_logger.error(msg)
-        self.cons_logger.error(self.ERROR + msg)
+        self.last_error = msg
+        self.logger.error(msg, extra = {'prefix': self.ERROR})
 
         return
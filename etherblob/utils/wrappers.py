@@ -1,19 +1,26 @@
 import os
+import shutil
 import traceback
+from etherblob.utils.errors import FatalError
 
 # if error occurs on engine when there's no progress so far, then remove log and dir
 def ends_gracefully(func):
     def wrap(*args, **kwargs):
         try:
             func(*args, **kwargs)
+        except FatalError:
+            # already handled (and logged) error, keep findings and indexes so far
+            args[0].save_progress()
+            raise
         except Exception as e:
             self = args[0]
+            self.save_progress()
             # file size is 0
-            if os.path.getsize(self.logger.out_log):
+            if self.logger.out_log and os.path.getsize(self.logger.out_log):
                 os.remove(self.logger.out_log)
-            # dir is empty
-            if not os.listdir(self.ext_dir):
-                os.rmdir(self.ext_dir)
+            # no files were extracted (dir only holds the findings' index)
+            if not self.stats.files_c:
+                shutil.rmtree(self.ext_dir)
 
             # inform about error
             self.logger.error(f"Unhandled error on engine: {e}")
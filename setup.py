@@ -24,12 +24,15 @@ setup(
         ]
     },
     install_requires=['argparse',
-                      'etherscan-python',
                       'python-magic',
+                      'requests',
                       'binwalk@git+https://github.com/ReFirmLabs/binwalk.git',
                       'pyfiglet',
                       'termcolor'
                       ],
+    extras_require={
+        'zstd': ['zstandard']
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'License :: OSI Approved :: MIT License',
@@ -0,0 +1,83 @@
+import gzip
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from etherblob.lib.api import Api
+
+
+class BlockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections_c = 0
+
+    # count every new connection
+    def setup(self):
+        super().setup()
+        BlockHandler.connections_c += 1
+
+
+    # send chain head, or gzipped block with chunked encoding (as compressed api responses come)
+    def do_GET(self):
+        if "eth_blockNumber" in self.path:
+            body = json.dumps({'jsonrpc': "2.0", 'id': 1, 'result': "0x10"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        body = gzip.compress(json.dumps({'jsonrpc': "2.0", 'id': 1, 'result': {
+            'number': "0xa", 'transactions': [{'hash': "0x%064x" % i, 'input': "0x00"} for i in range(3)]
+        }}).encode() + b"\n")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(body), 16):
+            chunk = body[i:i + 16]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+    def log_message(self, *args):
+        pass
+
+
+class ApiTest(unittest.TestCase):
+    def setUp(self):
+        BlockHandler.connections_c = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), BlockHandler)
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+
+    def test_block_fetches_reuse_connection(self):
+        api = Api("key", "main")
+        api.url = f"http://127.0.0.1:{self.server.server_port}/api"
+
+        for _ in range(5):
+            block_info = api.stream_proxy_block_by_number(10)
+            self.assertEqual(len(list(block_info)), 3)
+
+        self.assertEqual(BlockHandler.connections_c, 1)
+
+
+    def test_requests_are_rate_limited(self):
+        api = Api("key", "main", concurrency = 4, rate_limit = 20)
+        api.url = f"http://127.0.0.1:{self.server.server_port}/api"
+
+        # 11 requests (even concurrent ones) at 20 per sec take at least half a sec
+        start_t = time.monotonic()
+        heads = list(api.pool.map(lambda _: api.get_proxy_block_number(), range(11)))
+
+        self.assertEqual(heads, [16] * 11)
+        self.assertGreaterEqual(time.monotonic() - start_t, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
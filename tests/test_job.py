@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from etherblob import Config
+from etherblob.lib.api import Api
+from etherblob.lib.explorer import EtherBlobExplorer
+from etherblob.lib.extractor import Extractor
+from etherblob.lib.parser import BlockParser
+from etherblob.lib.timestamps import TimestampIndex
+
+
+class ProcessBlockTest(unittest.TestCase):
+    TRANS_C = 10
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+
+    # block response split into one chunk per transaction (plus its opening and closing ones)
+    def block_chunks(self, blk_id):
+        txs = [json.dumps({'hash': "0x%064x" % i, 'blockNumber': hex(blk_id), 'input': "0x"}).encode()
+                for i in range(self.TRANS_C)]
+        head = b'{"jsonrpc":"2.0","id":1,"result":{"number":"%s","timestamp":"0x1","transactions":[' % \
+                hex(blk_id).encode()
+
+        return [head] + [(b"," if i else b"") + tx for i, tx in enumerate(txs)] + [b']}}']
+
+
+    # fake block stream that breaks after delivering given number of transactions
+    def failing_stream(self, fail_after):
+        attempts = iter(fail_after)
+
+        def stream(api, blk_id, skip = 0, full_tx = True, fields = None):
+            limit = next(attempts, None)
+            chunks = self.block_chunks(blk_id)
+
+            def iter_chunks():
+                for i, chunk in enumerate(chunks):
+                    if limit is not None and i > limit:
+                        raise ConnectionError("connection reset")
+                    yield chunk
+
+            return BlockParser(iter_chunks(), skip, fields)
+
+        return stream
+
+
+    def test_retry_never_processes_transactions_twice(self):
+        seen = []
+        config = Config(10, 10, api_key = "key", out_log = None,
+                        output_dir = os.path.join(self.tmp_dir.name, "ext"),
+                        ts_index = os.path.join(self.tmp_dir.name, "ts-index"))
+
+        # second attempt fails earlier on the stream than the first one
+        with mock.patch.object(Api, 'stream_proxy_block_by_number', self.failing_stream([8, 2])), \
+        mock.patch.object(Extractor, 'extract_from_transaction', lambda ext, trans, hash_id: seen.append(hash_id)):
+            explorer = EtherBlobExplorer(config)
+            self.addCleanup(explorer.logger.close)
+            self.addCleanup(explorer.save_progress)
+
+            job = explorer.jobs[0]
+            job.last_retry_t = 0
+            job.process_block(10)
+
+        self.assertEqual(seen, ["0x%064x" % i for i in range(self.TRANS_C)])
+
+
+class JobsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+
+    # fake block stream with no transactions, timestamp being block id
+    @staticmethod
+    def stream(api, blk_id, skip = 0, full_tx = True, fields = None):
+        body = json.dumps({'jsonrpc': "2.0", 'id': 1, 'result': {
+            'number': hex(blk_id), 'timestamp': hex(blk_id), 'transactions': []
+        }}).encode()
+
+        return BlockParser([body], skip, fields)
+
+
+    def test_jobs_on_same_network_share_timestamp_index(self):
+        ts_path = os.path.join(self.tmp_dir.name, "ts-index")
+        config = Config(10, 12, api_key = "key", out_log = None, jobs = [("main", 20, 22), ("main", 30, 31, 2.5)],
+                        output_dir = os.path.join(self.tmp_dir.name, "ext"), ts_index = ts_path)
+
+        with mock.patch.object(Api, 'stream_proxy_block_by_number', self.stream):
+            explorer = EtherBlobExplorer(config)
+            explorer.run_engine()
+
+        self.assertEqual([job.api.interval for job in explorer.jobs], [0.2, 0.2, 0.4])
+        self.assertEqual(len({id(job.ts_index) for job in explorer.jobs}), 1)
+        self.assertEqual(list(TimestampIndex(ts_path, "main").blocks), [10, 11, 12, 20, 21, 22, 30, 31])
+
+
+if __name__ == "__main__":
+    unittest.main()